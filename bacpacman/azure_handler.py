@@ -2,15 +2,32 @@ import contextlib
 import os
 import shutil
 import sys
-from collections.abc import Iterable
-from typing import Protocol, cast
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Generic, Protocol, TypeVar, cast
 
 import click
-from azure.core.exceptions import ClientAuthenticationError
-from azure.identity import DefaultAzureCredential
+import requests
+from azure.core.credentials import AccessToken, TokenCredential
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.identity import (
+    AzureCliCredential,
+    CredentialUnavailableError,
+    DefaultAzureCredential,
+    EnvironmentCredential,
+    ManagedIdentityCredential,
+    TokenCachePersistenceOptions,
+)
 from azure.mgmt.resource import ResourceManagementClient, SubscriptionClient
+from azure.mgmt.resourcegraph import ResourceGraphClient
 from azure.mgmt.sql import SqlManagementClient
-from azure.mgmt.sql.models import Database, Server
+from dotenv import dotenv_values, set_key
+from requests.adapters import HTTPAdapter
 
 
 class Subscription(Protocol):
@@ -20,24 +37,432 @@ class Subscription(Protocol):
     subscription_id: str | None
 
 
-def get_credential() -> DefaultAzureCredential:
-    """Gets the Azure credential."""
+class SqlServer(Protocol):
+    """A protocol for SQL Server-like objects."""
+
+    name: str | None
+    id: str | None
+
+
+class SqlDatabase(Protocol):
+    """A protocol for SQL Database-like objects."""
+
+    name: str | None
+    id: str | None
+
+
+@dataclass
+class SubscriptionRecord:
+    """A plain subscription record, as restored from a cache or query."""
+
+    display_name: str | None
+    subscription_id: str | None
+
+
+@dataclass
+class ServerRecord:
+    """A plain SQL server record, as restored from a cache or query."""
+
+    name: str | None
+    id: str | None
+
+
+@dataclass
+class DatabaseRecord:
+    """
+    A plain database record, as restored from a cache or query.
+
+    The size and SKU fields are filled in by enrich_databases() and are None
+    when they could not be found.
+    """
+
+    name: str | None
+    id: str | None
+    size_bytes: float | None = None
+    max_size_bytes: int | None = None
+    sku: str | None = None
+    tier: str | None = None
+    elastic_pool: str | None = None
+
+
+# Discovery backends: "arm" walks the SQL management API subscription by
+# subscription, "resource-graph" answers from Azure Resource Graph queries.
+DISCOVERY_BACKENDS = ("arm", "resource-graph")
+
+
+# Credential strategies, fastest first. "auto" tries "cli", "env" and
+# "managed-identity" in that order and remembers the first that works, so later
+# runs skip the probes; "default" is the full DefaultAzureCredential chain.
+CREDENTIAL_STRATEGIES = ("cli", "env", "managed-identity", "default")
+_AUTO_CHAIN = ("cli", "env", "managed-identity")
+
+# Tokens are reused until they are this many seconds from expiry.
+TOKEN_REFRESH_MARGIN = 300
+
+# Scope of access tokens for Azure SQL databases, as passed to sqlpackage.
+SQL_DATABASE_SCOPE = "https://database.windows.net/.default"
+
+# Seconds between background checks of the SQL database token. Well inside
+# TOKEN_REFRESH_MARGIN, so the token is renewed before anyone has to wait.
+TOKEN_REFRESH_INTERVAL = 60
+
+_T = TypeVar("_T")
+
+# Connections kept open per host by the shared HTTP session. Sized above the
+# default of 10 so concurrent discovery does not discard pooled connections.
+HTTP_POOL_SIZE = 32
+
+# Process-wide pool of the credential and management clients. Building a new
+# DefaultAzureCredential per call re-acquires tokens, and every new client opens
+# its own TLS sessions, so both are created once and shared until invalidated.
+_pool_lock = threading.RLock()
+_credential: "PooledCredential | None" = None
+_credential_strategy: str | None = None
+_session: requests.Session | None = None
+_clients: dict[tuple[str, str], object] = {}
+
+_token_refresher: threading.Thread | None = None
+
+# Index of (subscription ID, server name) -> resource group, filled as servers
+# are listed so a database lookup never has to walk the server list again.
+_resource_groups: dict[tuple[str, str], str] = {}
+
+# Background listings started ahead of the user's choices. Readers take a
+# prefetch out of the registry and stream from it; anything never taken is
+# cancelled by cancel_prefetch().
+PREFETCH_WORKERS = 4
+_prefetch_executor: ThreadPoolExecutor | None = None
+_prefetches: dict[tuple[str, ...], "tuple[_Prefetch[object], Future[None]]"] = {}
+
+
+class _Prefetch(Generic[_T]):
+    """A listing that runs ahead in the background and can be read as it fills."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._items: list[_T] = []
+        self._done = False
+        self._error: Exception | None = None
+        self.cancelled = threading.Event()
+
+    def run(self, source: Callable[[], Iterable[_T]]) -> None:
+        """Consumes the source, stopping early if the prefetch is cancelled."""
+        try:
+            for item in source():
+                if self.cancelled.is_set():
+                    return
+                with self._condition:
+                    self._items.append(item)
+                    self._condition.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def __iter__(self) -> Iterator[_T]:
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self._items) and not self._done:
+                    self._condition.wait()
+                if index < len(self._items):
+                    item = self._items[index]
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            index += 1
+            yield item
+
+
+class PooledCredential:
+    """
+    The process-wide credential handed to every management client.
+
+    Tokens are shared across clients until they near expiry, so each scope is
+    only fetched once however many clients are pooled. The underlying
+    credentials are tried in order until one is available; when ``remember``
+    is set, the one that worked is saved to .env as BACPACMAN_CREDENTIAL.
+    """
+
+    def __init__(
+        self, candidates: list[tuple[str, TokenCredential]], remember: bool
+    ) -> None:
+        self._candidates = candidates
+        self._remember = remember
+        self._chosen: TokenCredential | None = None
+        self._tokens: dict[tuple[str, ...], AccessToken] = {}
+        self._lock = threading.Lock()
+
+    def get_token(
+        self,
+        *scopes: str,
+        claims: str | None = None,
+        tenant_id: str | None = None,
+        enable_cae: bool = False,
+        **kwargs: Any,
+    ) -> AccessToken:
+        """Returns a cached token for the scopes, fetching one when needed."""
+        key = (tenant_id or "", str(enable_cae), *scopes)
+        with self._lock:
+            token = self._tokens.get(key)
+            if (
+                token is not None
+                and not claims
+                and token.expires_on - time.time() > TOKEN_REFRESH_MARGIN
+            ):
+                return token
+            token = self._fetch(
+                scopes, claims=claims, tenant_id=tenant_id, enable_cae=enable_cae
+            )
+            self._tokens[key] = token
+            return token
+
+    def _fetch(self, scopes: tuple[str, ...], **kwargs: Any) -> AccessToken:
+        if self._chosen is not None:
+            return self._chosen.get_token(*scopes, **kwargs)
+        unavailable: list[str] = []
+        for name, credential in self._candidates:
+            try:
+                token = credential.get_token(*scopes, **kwargs)
+            except (CredentialUnavailableError, ClientAuthenticationError) as e:
+                # A strategy that is set up but cannot sign in here, such as
+                # one whose token cache cannot be opened, should not stop the
+                # rest of the chain from being tried.
+                unavailable.append(f"{name}: {e.message}")
+                continue
+            self._chosen = credential
+            if self._remember:
+                with contextlib.suppress(OSError):
+                    set_key(".env", "BACPACMAN_CREDENTIAL", name)
+            return token
+        raise CredentialUnavailableError(
+            "No credential strategy was available. " + "; ".join(unavailable)
+        )
+
+    def close(self) -> None:
+        """Closes the underlying credentials."""
+        for _, credential in self._candidates:
+            close = getattr(credential, "close", None)
+            if close is not None:
+                with contextlib.suppress(Exception):
+                    close()
+
+
+class _EnvironmentCredential:
+    """
+    A service principal credential that caches its tokens on disk if it can.
+
+    Tokens are kept in MSAL's encrypted on-disk cache, so later runs can skip
+    the token request. Where the cache cannot be encrypted, such as on a
+    headless Linux host without libsecret, tokens are only kept in memory.
+    """
+
+    def __init__(self) -> None:
+        self._credential = EnvironmentCredential(
+            cache_persistence_options=TokenCachePersistenceOptions(name="bacpacman")
+        )
+        self._persistent = True
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        try:
+            return self._credential.get_token(*scopes, **kwargs)
+        except ClientAuthenticationError as e:
+            # azure-identity reports a cache it cannot open as a ValueError.
+            if not self._persistent or not isinstance(e.__cause__, ValueError):
+                raise
+        self.close()
+        self._credential = EnvironmentCredential()
+        self._persistent = False
+        return self._credential.get_token(*scopes, **kwargs)
+
+    def close(self) -> None:
+        self._credential.close()
+
+
+def _new_credential(strategy: str) -> TokenCredential:
+    if strategy == "cli":
+        return AzureCliCredential()
+    if strategy == "env":
+        return _EnvironmentCredential()
+    if strategy == "managed-identity":
+        return ManagedIdentityCredential()
     return DefaultAzureCredential()
 
 
+def set_credential_strategy(strategy: str | None) -> None:
+    """Overrides the credential strategy for this process."""
+    global _credential_strategy
+    with _pool_lock:
+        _credential_strategy = strategy
+    reset_client_pool()
+
+
+def get_credential_strategy() -> tuple[str, bool]:
+    """
+    Resolves the credential strategy and whether it was explicitly chosen.
+
+    An explicit choice comes from set_credential_strategy() or the
+    BACPACMAN_CREDENTIAL environment variable; otherwise the strategy
+    remembered in .env is tried first, falling back to the auto chain.
+    """
+    explicit = _credential_strategy or os.getenv("BACPACMAN_CREDENTIAL")
+    if explicit in CREDENTIAL_STRATEGIES:
+        return explicit, True
+    remembered = dotenv_values(".env").get("BACPACMAN_CREDENTIAL")
+    if remembered in CREDENTIAL_STRATEGIES:
+        return remembered, False
+    return "auto", False
+
+
+def get_credential() -> PooledCredential:
+    """Gets the shared Azure credential."""
+    global _credential
+    with _pool_lock:
+        if _credential is None:
+            strategy, explicit = get_credential_strategy()
+            if explicit:
+                names = [strategy]
+            else:
+                # A remembered strategy goes first; the rest of the auto chain
+                # is kept as a fallback in case it stops working.
+                names = [strategy] if strategy != "auto" else []
+                names += [name for name in _AUTO_CHAIN if name not in names]
+            _credential = PooledCredential(
+                [(name, _new_credential(name)) for name in names],
+                remember=not explicit,
+            )
+        return _credential
+
+
+def get_transport() -> RequestsTransport:
+    """Gets an HTTP transport backed by the shared connection pool."""
+    global _session
+    with _pool_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.mount("https://", HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE))
+        # The pool owns the session, so closing a client must not close it.
+        return RequestsTransport(session=_session, session_owner=False)
+
+
+def _pooled(kind: str, subscription_id: str, factory: Callable[[], _T]) -> _T:
+    """Returns the pooled client for a subscription, creating it on first use."""
+    key = (kind, subscription_id)
+    with _pool_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return cast(_T, client)
+
+
 def get_subscription_client() -> SubscriptionClient:
     """Gets the subscription client."""
-    return SubscriptionClient(get_credential())
+    return _pooled(
+        "subscription",
+        "",
+        lambda: SubscriptionClient(get_credential(), transport=get_transport()),
+    )
 
 
 def get_resource_client(subscription_id: str) -> ResourceManagementClient:
     """Gets the resource management client."""
-    return ResourceManagementClient(get_credential(), subscription_id)
+    return _pooled(
+        "resource",
+        subscription_id,
+        lambda: ResourceManagementClient(
+            get_credential(), subscription_id, transport=get_transport()
+        ),
+    )
 
 
 def get_sql_client(subscription_id: str) -> SqlManagementClient:
     """Gets the SQL management client."""
-    return SqlManagementClient(get_credential(), subscription_id)
+    return _pooled(
+        "sql",
+        subscription_id,
+        lambda: SqlManagementClient(
+            get_credential(), subscription_id, transport=get_transport()
+        ),
+    )
+
+
+def get_resource_graph_client() -> ResourceGraphClient:
+    """Gets the Azure Resource Graph client."""
+    return _pooled(
+        "resourcegraph",
+        "",
+        lambda: ResourceGraphClient(get_credential(), transport=get_transport()),
+    )
+
+
+def reset_client_pool() -> None:
+    """
+    Invalidates the pooled credential, clients and HTTP session.
+
+    Call this after the user logs in again, or when a token has been revoked, so
+    the next request authenticates from scratch.
+    """
+    global _credential, _session
+    with _pool_lock:
+        for client in _clients.values():
+            with contextlib.suppress(Exception):
+                cast(SqlManagementClient, client).close()
+        _clients.clear()
+        if _credential is not None:
+            with contextlib.suppress(Exception):
+                _credential.close()
+            _credential = None
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _refresh_sql_token() -> None:
+    while True:
+        time.sleep(TOKEN_REFRESH_INTERVAL)
+        # Failures are left for the next foreground request to report.
+        with contextlib.suppress(Exception):
+            get_credential().get_token(SQL_DATABASE_SCOPE)
+
+
+def get_sql_access_token() -> str:
+    """
+    Returns an access token for Azure SQL databases from the shared credential.
+
+    The first call starts a background thread that renews the token before it
+    nears expiry, so long batches never wait on a token refresh.
+    """
+    global _token_refresher
+    token = get_credential().get_token(SQL_DATABASE_SCOPE).token
+    with _pool_lock:
+        if _token_refresher is None:
+            _token_refresher = threading.Thread(
+                target=_refresh_sql_token, name="token-refresh", daemon=True
+            )
+            _token_refresher.start()
+    return token
+
+
+def current_subscription_id() -> str:
+    """
+    Returns the selected subscription from AZURE_SUBSCRIPTION_ID, or the one
+    saved to .env by 'select-subscription'.
+
+    Raises ValueError if no subscription has been selected.
+    """
+    subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID") or dotenv_values(".env").get(
+        "AZURE_SUBSCRIPTION_ID"
+    )
+    if not subscription_id:
+        raise ValueError(
+            "No subscription has been selected. "
+            "Run 'bacpacman select-subscription' first."
+        )
+    return subscription_id
 
 
 def list_subscriptions() -> list[Subscription]:
@@ -52,27 +477,292 @@ def list_subscriptions() -> list[Subscription]:
     return cast(list[Subscription], subscriptions)
 
 
-def list_servers(subscription_id: str) -> Iterable[Server]:
-    """Lists all SQL servers in a subscription."""
-    sql_client = get_sql_client(subscription_id)
-    return cast(Iterable[Server], sql_client.servers.list())
+def resource_group_from_id(resource_id: str) -> str | None:
+    """Extracts the resource group name from an ARM resource ID."""
+    parts = resource_id.split("/")
+    for i, part in enumerate(parts[:-1]):
+        if part.lower() == "resourcegroups":
+            return parts[i + 1]
+    return None
+
+
+def remember_resource_group(
+    subscription_id: str, server_name: str, resource_group_name: str
+) -> None:
+    """Records the resource group a SQL server lives in."""
+    with _pool_lock:
+        _resource_groups[(subscription_id, server_name.lower())] = resource_group_name
+
+
+def get_resource_group(subscription_id: str, server_name: str) -> str | None:
+    """Looks up a SQL server's resource group in the index."""
+    with _pool_lock:
+        return _resource_groups.get((subscription_id, server_name.lower()))
+
+
+def get_discovery_backend() -> str:
+    """Returns the discovery backend selected by BACPACMAN_DISCOVERY_BACKEND."""
+    backend = os.getenv("BACPACMAN_DISCOVERY_BACKEND", "arm").lower()
+    return backend if backend in DISCOVERY_BACKENDS else "arm"
+
+
+def _start_prefetch(key: tuple[str, ...], source: Callable[[], Iterable[_T]]) -> None:
+    global _prefetch_executor
+    with _pool_lock:
+        if key in _prefetches:
+            return
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(
+                max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch"
+            )
+        prefetch: _Prefetch[_T] = _Prefetch()
+        future = _prefetch_executor.submit(prefetch.run, source)
+        _prefetches[key] = (cast(_Prefetch[object], prefetch), future)
+
+
+def _take_prefetch(key: tuple[str, ...]) -> _Prefetch[object] | None:
+    with _pool_lock:
+        entry = _prefetches.pop(key, None)
+    if entry is None or entry[1].cancelled():
+        return None
+    return entry[0]
+
+
+def prefetch_servers(subscription_id: str) -> None:
+    """Starts listing a subscription's servers before they are asked for."""
+    _start_prefetch(
+        ("servers", subscription_id), lambda: _list_servers_live(subscription_id)
+    )
+
+
+def prefetch_databases(
+    subscription_id: str, server_name: str, resource_group_name: str | None = None
+) -> None:
+    """Starts listing a server's databases before they are asked for."""
+    _start_prefetch(
+        ("databases", subscription_id, server_name.lower()),
+        lambda: _list_databases_live(subscription_id, server_name, resource_group_name),
+    )
+
 
+def cancel_prefetch(
+    keep_subscription_id: str | None = None, keep_server_name: str | None = None
+) -> None:
+    """
+    Cancels prefetches that have not been consumed.
 
-def list_databases(subscription_id: str, server_name: str) -> Iterable[Database]:
+    Prefetches for the given subscription's servers and the given server's
+    databases are kept, so a confirmed selection can still use them.
+    """
+    keep = {
+        ("servers", keep_subscription_id),
+        ("databases", keep_subscription_id, (keep_server_name or "").lower()),
+    }
+    with _pool_lock:
+        entries = [v for k, v in _prefetches.items() if k not in keep]
+        for key in [k for k in _prefetches if k not in keep]:
+            del _prefetches[key]
+    for prefetch, future in entries:
+        future.cancel()
+        prefetch.cancelled.set()
+
+
+def list_servers(subscription_id: str) -> Iterator[SqlServer]:
+    """Lists all SQL servers in a subscription, indexing their resource groups."""
+    prefetch = _take_prefetch(("servers", subscription_id))
+    if prefetch is not None:
+        return cast(Iterator[SqlServer], iter(prefetch))
+    return _list_servers_live(subscription_id)
+
+
+def _list_servers_live(subscription_id: str) -> Iterator[SqlServer]:
+    servers: Iterable[SqlServer]
+    if get_discovery_backend() == "resource-graph":
+        from . import resource_graph  # Imported here to avoid a circular import.
+
+        servers = resource_graph.list_servers(subscription_id)
+    else:
+        servers = get_sql_client(subscription_id).servers.list()
+    for server in servers:
+        if server.name and server.id:
+            resource_group_name = resource_group_from_id(server.id)
+            if resource_group_name:
+                remember_resource_group(
+                    subscription_id, server.name, resource_group_name
+                )
+        yield server
+
+
+def list_databases(
+    subscription_id: str,
+    server_name: str,
+    resource_group_name: str | None = None,
+) -> Iterable[SqlDatabase]:
     """Lists all databases on a SQL server."""
+    prefetch = _take_prefetch(("databases", subscription_id, server_name.lower()))
+    if prefetch is not None:
+        return cast(Iterable[SqlDatabase], prefetch)
+    return _list_databases_live(subscription_id, server_name, resource_group_name)
+
+
+def find_resource_group(subscription_id: str, server_name: str) -> str | None:
+    """Looks up a server's resource group, indexing the servers if needed."""
+    resource_group_name = get_resource_group(subscription_id, server_name)
+    if not resource_group_name:
+        # Not indexed yet; a single pass over the servers indexes all of them.
+        for _ in _list_servers_live(subscription_id):
+            pass
+        resource_group_name = get_resource_group(subscription_id, server_name)
+    return resource_group_name
+
+
+def _list_databases_live(
+    subscription_id: str,
+    server_name: str,
+    resource_group_name: str | None = None,
+) -> Iterable[SqlDatabase]:
+    if get_discovery_backend() == "resource-graph":
+        from . import resource_graph  # Imported here to avoid a circular import.
+
+        return resource_graph.list_databases(subscription_id, server_name)
+    if resource_group_name:
+        remember_resource_group(subscription_id, server_name, resource_group_name)
+    else:
+        resource_group_name = find_resource_group(subscription_id, server_name)
+    if not resource_group_name:
+        return []  # Server not found
     sql_client = get_sql_client(subscription_id)
+    return cast(
+        Iterable[SqlDatabase],
+        sql_client.databases.list_by_server(resource_group_name, server_name),
+    )
+
+
+def get_database_size(
+    subscription_id: str,
+    resource_group_name: str,
+    server_name: str,
+    database_name: str,
+) -> float | None:
+    """Returns the space a database's data currently uses, in bytes."""
+    sql_client = get_sql_client(subscription_id)
+    usages = sql_client.database_usages.list_by_database(
+        resource_group_name, server_name, database_name
+    )
+    for usage in usages:
+        if (usage.name or "").lower() == "database_size":
+            return usage.current_value
+    return None
+
+
+def lookup_database_size(server_name: str, database_name: str) -> float | None:
+    """
+    Looks up a database's used size in the selected subscription.
+
+    Returns None if the size cannot be found, so callers can carry on without
+    it.
+    """
     try:
-        all_servers = list_servers(subscription_id)
-        server_details = next((s for s in all_servers if s.name == server_name), None)
-        if server_details and server_details.id:
-            resource_group_name = server_details.id.split("/")[4]
-            return cast(
-                Iterable[Database],
-                sql_client.databases.list_by_server(resource_group_name, server_name),
-            )
-    except StopIteration:
-        pass  # Server not found, will return empty list
-    return []
+        subscription_id = current_subscription_id()
+        resource_group_name = find_resource_group(subscription_id, server_name)
+        if not resource_group_name:
+            return None
+        return get_database_size(
+            subscription_id, resource_group_name, server_name, database_name
+        )
+    except (ValueError, HttpResponseError):
+        return None
+
+
+def _enum_value(value: object) -> str:
+    """Returns an SDK enum's value, or a plain string, in lower case."""
+    return str(getattr(value, "value", value) or "").lower()
+
+
+def find_geo_secondary(
+    subscription_id: str, server_name: str, database_name: str
+) -> tuple[str, str] | None:
+    """
+    Finds a readable secondary of a database through its replication links.
+
+    Returns the secondary's server and database names, or None if the database
+    has no readable geo-replica or named replica.
+    """
+    resource_group_name = find_resource_group(subscription_id, server_name)
+    if not resource_group_name:
+        return None
+    links = get_sql_client(subscription_id).replication_links.list_by_database(
+        resource_group_name, server_name, database_name
+    )
+    for link in links:
+        # Newer SDKs nest the link's fields under .properties.
+        properties = getattr(link, "properties", None) or link
+        partner_role = _enum_value(getattr(properties, "partner_role", None))
+        link_type = _enum_value(getattr(properties, "link_type", None))
+        partner_server = getattr(properties, "partner_server", None)
+        if (
+            partner_role == "secondary"
+            and link_type in ("geo", "named")
+            and partner_server
+        ):
+            partner_database = getattr(properties, "partner_database", None)
+            return partner_server, partner_database or database_name
+    return None
+
+
+def to_database_record(database: SqlDatabase) -> DatabaseRecord:
+    """Copies the fields bacpacman uses from an SDK database or record."""
+    if isinstance(database, DatabaseRecord):
+        return DatabaseRecord(**vars(database))
+    sku = getattr(database, "sku", None)
+    elastic_pool_id: str | None = getattr(database, "elastic_pool_id", None)
+    return DatabaseRecord(
+        name=database.name,
+        id=database.id,
+        max_size_bytes=getattr(database, "max_size_bytes", None),
+        sku=getattr(sku, "name", None),
+        tier=getattr(sku, "tier", None),
+        elastic_pool=elastic_pool_id.rsplit("/", 1)[-1] if elastic_pool_id else None,
+    )
+
+
+def enrich_databases(
+    subscription_id: str,
+    server_name: str,
+    databases: Iterable[SqlDatabase],
+    max_workers: int = 8,
+) -> Iterator[DatabaseRecord]:
+    """
+    Adds the current size, max size, SKU and elastic pool to each database.
+
+    Usage lookups run concurrently, and records are yielded in their original
+    order as soon as they are ready, so a streaming listing keeps streaming.
+    Databases whose usage cannot be read keep a size of None.
+    """
+
+    def enrich(database: SqlDatabase) -> DatabaseRecord:
+        record = to_database_record(database)
+        resource_group_name = resource_group_from_id(record.id or "")
+        if record.size_bytes is None and record.name and resource_group_name:
+            with contextlib.suppress(HttpResponseError):
+                record.size_bytes = get_database_size(
+                    subscription_id, resource_group_name, server_name, record.name
+                )
+        return record
+
+    if max_workers <= 1:
+        yield from (enrich(database) for database in databases)
+        return
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="enrich"
+    ) as pool:
+        pending: deque[Future[DatabaseRecord]] = deque()
+        for database in databases:
+            pending.append(pool.submit(enrich, database))
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 def check_azure_cli() -> None:
@@ -0,0 +1,222 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from . import azure_handler
+from .azure_handler import (
+    DatabaseRecord,
+    ServerRecord,
+    SqlServer,
+    Subscription,
+    SubscriptionRecord,
+)
+
+# Seconds each level of the inventory is considered fresh. Older entries are
+# still served immediately, but are refreshed in the background.
+TTLS: dict[str, float] = {
+    "subscriptions": 24 * 60 * 60,
+    "servers": 60 * 60,
+    "databases": 10 * 60,
+}
+
+# Bumped whenever the shape of the cached records changes.
+SCHEMA_VERSION = 2
+
+_lock = threading.Lock()
+_revalidating: set[str] = set()
+
+
+def cache_dir() -> Path:
+    """Returns the per-user cache directory for bacpacman."""
+    override = os.getenv("BACPACMAN_CACHE_DIR")
+    if override:
+        return Path(override)
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = str(Path.home() / "Library" / "Caches")
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "bacpacman"
+
+
+def _cache_file() -> Path:
+    return cache_dir() / "inventory.json"
+
+
+def _load() -> dict[str, Any]:
+    try:
+        with open(_cache_file(), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != SCHEMA_VERSION:
+        return {}
+    return data
+
+
+def _read_entry(key: str) -> dict[str, Any] | None:
+    with _lock:
+        entry = _load().get(key)
+    if isinstance(entry, dict) and isinstance(entry.get("items"), list):
+        return entry
+    return None
+
+
+def _write_entry(key: str, items: list[dict[str, Any]]) -> None:
+    path = _cache_file()
+    with _lock:
+        data = _load()
+        data["version"] = SCHEMA_VERSION
+        data[key] = {"fetched_at": time.time(), "items": items}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # The cache is an optimisation; never fail a run over it.
+
+
+def _revalidate(key: str, fetch: Callable[[], Iterable[dict[str, Any]]]) -> None:
+    """Refreshes a stale entry on a background thread."""
+    with _lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def worker() -> None:
+        try:
+            with contextlib.suppress(Exception):
+                _write_entry(key, list(fetch()))
+        finally:
+            with _lock:
+                _revalidating.discard(key)
+
+    threading.Thread(target=worker, name=f"revalidate {key}", daemon=True).start()
+
+
+def _is_fresh(key: str, level: str) -> bool:
+    entry = _read_entry(key)
+    return (
+        entry is not None
+        and time.time() - float(entry.get("fetched_at", 0)) <= TTLS[level]
+    )
+
+
+def _fetch_and_store(
+    key: str, fetch: Callable[[], Iterable[dict[str, Any]]]
+) -> Iterator[dict[str, Any]]:
+    """Yields live items as they arrive, caching them once all have been read."""
+    items: list[dict[str, Any]] = []
+    for item in fetch():
+        items.append(item)
+        yield item
+    _write_entry(key, items)
+
+
+def _cached(
+    key: str,
+    level: str,
+    fetch: Callable[[], Iterable[dict[str, Any]]],
+    refresh: bool,
+) -> Iterable[dict[str, Any]]:
+    """Serves an entry from the cache, streaming it live when missing."""
+    entry = None if refresh else _read_entry(key)
+    if entry is None:
+        return _fetch_and_store(key, fetch)
+    if time.time() - float(entry.get("fetched_at", 0)) > TTLS[level]:
+        _revalidate(key, fetch)
+    return list(entry["items"])
+
+
+def list_subscriptions(refresh: bool = False) -> list[Subscription]:
+    """Lists subscriptions, preferring the cached inventory."""
+
+    def fetch() -> Iterator[dict[str, Any]]:
+        for s in azure_handler.list_subscriptions():
+            yield asdict(SubscriptionRecord(s.display_name, s.subscription_id))
+
+    items = _cached("subscriptions", "subscriptions", fetch, refresh)
+    subscriptions: list[Subscription] = [SubscriptionRecord(**i) for i in items]
+    return subscriptions
+
+
+def list_servers(subscription_id: str, refresh: bool = False) -> Iterator[SqlServer]:
+    """
+    Lists the SQL servers in a subscription, preferring the cached inventory.
+
+    On a cache miss, servers are yielded page by page as Azure returns them.
+    """
+
+    def fetch() -> Iterator[dict[str, Any]]:
+        for s in azure_handler.list_servers(subscription_id):
+            yield asdict(ServerRecord(s.name, s.id))
+
+    for item in _cached(f"servers:{subscription_id}", "servers", fetch, refresh):
+        server = ServerRecord(**item)
+        # Cached servers still feed the resource group index, so a database
+        # lookup does not need to list the servers again.
+        resource_group_name = azure_handler.resource_group_from_id(server.id or "")
+        if server.name and resource_group_name:
+            azure_handler.remember_resource_group(
+                subscription_id, server.name, resource_group_name
+            )
+        yield server
+
+
+def list_databases(
+    subscription_id: str, server_name: str, refresh: bool = False
+) -> Iterator[DatabaseRecord]:
+    """
+    Lists the databases on a SQL server, preferring the cached inventory.
+
+    Each database carries its size, SKU and elastic pool. On a cache miss,
+    databases are yielded page by page as Azure returns them.
+    """
+
+    def fetch() -> Iterator[dict[str, Any]]:
+        databases = azure_handler.list_databases(subscription_id, server_name)
+        for record in azure_handler.enrich_databases(
+            subscription_id, server_name, databases
+        ):
+            yield asdict(record)
+
+    key = f"databases:{subscription_id}:{server_name.lower()}"
+    for item in _cached(key, "databases", fetch, refresh):
+        yield DatabaseRecord(**item)
+
+
+def prefetch_servers(subscription_id: str, refresh: bool = False) -> None:
+    """Starts fetching a subscription's servers unless the cache is fresh."""
+    if refresh or not _is_fresh(f"servers:{subscription_id}", "servers"):
+        azure_handler.prefetch_servers(subscription_id)
+
+
+def prefetch_databases(
+    subscription_id: str,
+    server_name: str,
+    resource_group_name: str | None = None,
+    refresh: bool = False,
+) -> None:
+    """Starts fetching a server's databases unless the cache is fresh."""
+    key = f"databases:{subscription_id}:{server_name.lower()}"
+    if refresh or not _is_fresh(key, "databases"):
+        azure_handler.prefetch_databases(
+            subscription_id, server_name, resource_group_name
+        )
+
+
+def clear() -> None:
+    """Deletes the cached inventory."""
+    with _lock:
+        with contextlib.suppress(FileNotFoundError):
+            _cache_file().unlink()
@@ -1,19 +1,116 @@
+import functools
+import json
 import os
+import sys
+import time
+from collections.abc import Callable
 
 import click
-from azure.core.exceptions import ClientAuthenticationError
+import keyring.errors
+import questionary
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
 from azure.identity import CredentialUnavailableError
 from dotenv import set_key
 
-from . import azure_handler, sql_handler, ui
+from . import (
+    azure_handler,
+    cache,
+    copies,
+    inventory,
+    manifest,
+    planning,
+    profiles,
+    scaling,
+    scheduler,
+    sql_handler,
+    ui,
+)
+from .azure_handler import DatabaseRecord
+
+_profile_option = click.option(
+    "--profile",
+    type=click.Choice(profiles.PROFILE_NAMES),
+    default=profiles.AUTO,
+    show_default=True,
+    help="sqlpackage tuning profile. 'auto' picks one from the database size.",
+)
+
+_skip_space_check_option = click.option(
+    "--skip-space-check",
+    is_flag=True,
+    help="Start even if the output or temp volume looks too small.",
+)
+
+_include_table_option = click.option(
+    "--include-table",
+    "include_tables",
+    multiple=True,
+    help="Export data only for this table (e.g. 'dbo.Orders' or 'sales.*'). "
+    "May be repeated.",
+)
+
+_exclude_table_option = click.option(
+    "--exclude-table",
+    "exclude_tables",
+    multiple=True,
+    help="Skip this table's data (e.g. 'audit.*'). May be repeated. Needs pyodbc.",
+)
+
+_source_option = click.option(
+    "--source",
+    type=click.Choice(sql_handler.EXPORT_SOURCES),
+    default="primary",
+    show_default=True,
+    help="Read from the primary, a read-only replica (ApplicationIntent=ReadOnly), "
+    "or the database's geo-secondary.",
+)
+
+_via_copy_option = click.option(
+    "--via-copy",
+    is_flag=True,
+    help="Export from a temporary copy of each database, for a transactionally "
+    "consistent bacpac. The copy is dropped afterwards.",
+)
+
+_copy_service_objective_option = click.option(
+    "--copy-service-objective",
+    help="Service objective for the temporary copy, e.g. 'S3' or 'GP_Gen5_8'. "
+    "Defaults to the source's.",
+)
+
+_scale_to_option = click.option(
+    "--scale-to",
+    help="Scale the database to this service objective (e.g. 'S3') for the "
+    "export, then back to its original one.",
+)
+
+_restart_option = click.option(
+    "--restart",
+    is_flag=True,
+    help="Ignore jobs recorded as done by an earlier, unfinished run.",
+)
 
 
 @click.group(invoke_without_command=True)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Ignore the cached Azure inventory and fetch it again.",
+)
+@click.option(
+    "--credential",
+    type=click.Choice(azure_handler.CREDENTIAL_STRATEGIES),
+    help="How to authenticate to Azure (default: BACPACMAN_CREDENTIAL, or the "
+    "first of cli, env and managed-identity that works, remembered in .env).",
+)
 @click.pass_context
-def cli(ctx: click.Context) -> None:
+def cli(ctx: click.Context, refresh: bool, credential: str | None) -> None:
     """A utility for managing Azure SQL databases."""
+    ctx.ensure_object(dict)["refresh"] = refresh
+    if credential:
+        azure_handler.set_credential_strategy(credential)
     if ctx.invoked_subcommand is None:
-        ui.run_interactive_workflow()
+        ui.run_interactive_workflow(refresh)
 
 
 @cli.command()
@@ -24,12 +121,666 @@ def cli(ctx: click.Context) -> None:
 @click.option(
     "--output-file", default="database.bacpac", help="The output file for the bacpac."
 )
-def extract_bacpac(server_name: str, database_name: str, output_file: str) -> None:
+@_profile_option
+@_skip_space_check_option
+@_include_table_option
+@_exclude_table_option
+@_source_option
+@_via_copy_option
+@_copy_service_objective_option
+@_scale_to_option
+def extract_bacpac(
+    server_name: str,
+    database_name: str,
+    output_file: str,
+    profile: str,
+    skip_space_check: bool,
+    include_tables: tuple[str, ...],
+    exclude_tables: tuple[str, ...],
+    source: str,
+    via_copy: bool,
+    copy_service_objective: str | None,
+    scale_to: str | None,
+) -> None:
     """Extracts a bacpac from an Azure SQL database."""
-    # This command will default to Azure AD authentication.
-    sql_handler.extract_bacpac(
-        server_name, database_name, output_file, auth_method="aad"
+    _check_copy_options(source, via_copy, copy_service_objective)
+    if scale_to and (via_copy or source != "primary"):
+        raise click.UsageError(
+            "--scale-to cannot be combined with --via-copy or --source."
+        )
+
+    def export(name: str) -> bool:
+        # This command will default to Azure AD authentication.
+        return sql_handler.extract_bacpac(
+            server_name,
+            name,
+            output_file,
+            auth_method="aad",
+            profile=profile,
+            check_space=not skip_space_check,
+            include_tables=list(include_tables),
+            exclude_tables=list(exclude_tables),
+            source=source,
+        )
+
+    if scale_to:
+        try:
+            scaling.run_scaled_up(
+                server_name, database_name, scale_to, lambda: export(database_name)
+            )
+        except (ValueError, HttpResponseError) as e:
+            raise click.ClickException(str(e)) from e
+        return
+    if not via_copy:
+        export(database_name)
+        return
+    copy = _begin_copies(
+        server_name,
+        {database_name: copies.copy_name(database_name)},
+        copy_service_objective,
+    )[0]
+    click.echo(f"Waiting for {copy.copy_name} to come online...")
+    try:
+        copies.export_from_copy(copy, lambda: export(copy.copy_name))
+    except HttpResponseError as e:
+        raise click.ClickException(f"Copying {database_name} failed: {e}") from e
+    click.echo(f"Dropped {copy.copy_name}.")
+
+
+def _check_copy_options(
+    source: str, via_copy: bool, copy_service_objective: str | None
+) -> None:
+    if via_copy and source != "primary":
+        raise click.UsageError("--via-copy reads from the copy; drop --source.")
+    if copy_service_objective and not via_copy:
+        raise click.UsageError("--copy-service-objective needs --via-copy.")
+
+
+def _begin_copies(
+    server_name: str, copy_names: dict[str, str], service_objective: str | None
+) -> list[copies.DatabaseCopy]:
+    """
+    Starts copying every database at once, so the copies are made in parallel.
+
+    ``copy_names`` maps each database to the name of its copy. If any copy
+    cannot be started, the ones already started are dropped.
+    """
+    started: list[copies.DatabaseCopy] = []
+    try:
+        for database_name, name in copy_names.items():
+            copy = copies.begin_copy(
+                server_name, database_name, service_objective, name
+            )
+            click.echo(f"Copying {database_name} to {copy.copy_name}...")
+            started.append(copy)
+    except (ValueError, HttpResponseError) as e:
+        for copy in started:
+            copies.drop_copy(copy)
+        raise click.ClickException(str(e)) from e
+    return started
+
+
+def _export_from_copy(
+    unused_copies: dict[str, copies.DatabaseCopy],
+    copy: copies.DatabaseCopy,
+    export: Callable[[], None],
+) -> None:
+    """Runs a batch export from its copy, which the export then drops."""
+    unused_copies.pop(copy.copy_name, None)
+    copies.export_from_copy(copy, export)
+
+
+def _select_databases(
+    server_name: str, database_names: tuple[str, ...], select_all: bool, verb: str
+) -> list[DatabaseRecord]:
+    """
+    Resolves --database-name and --all, or asks which databases to use.
+
+    Databases come from the cached inventory unless --refresh was given.
+    """
+    options = click.get_current_context().find_object(dict) or {}
+    refresh = bool(options.get("refresh"))
+    try:
+        subscription_id = azure_handler.current_subscription_id()
+    except ValueError:
+        click.echo("Please select a subscription first using 'select-subscription'.")
+        return []
+
+    databases = {
+        (db.name or "").lower(): db
+        for db in cache.list_databases(subscription_id, server_name, refresh)
+        if db.name and db.name.lower() != "master"
+    }
+    if database_names:
+        missing = [name for name in database_names if name.lower() not in databases]
+        if missing:
+            click.echo(f"Databases not found on {server_name}: {', '.join(missing)}")
+            return []
+        selected = [databases[name.lower()] for name in database_names]
+    elif select_all:
+        selected = list(databases.values())
+    else:
+        selected = (
+            questionary.checkbox(
+                f"Select the databases to {verb}:",
+                choices=[
+                    questionary.Choice(planning.describe_database(db), db)
+                    for db in databases.values()
+                ],
+            ).ask()
+            or []
+        )
+    if not selected:
+        click.echo(f"No databases to {verb}.")
+    return selected
+
+
+@cli.command(name="export")
+@click.option("--server-name", prompt="Server Name", help="The name of the SQL server.")
+@click.option(
+    "--database-name",
+    "database_names",
+    multiple=True,
+    help="A database to export. May be repeated.",
+)
+@click.option(
+    "--all", "export_all", is_flag=True, help="Export every database on the server."
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=".",
+    show_default=True,
+    help="Where to write the bacpac files.",
+)
+@click.option(
+    "--auth",
+    "auth_method",
+    type=click.Choice(["aad", "sql"]),
+    default="aad",
+    show_default=True,
+    help="How sqlpackage authenticates to the server.",
+)
+@click.option("--username", help="The SQL login, with --auth sql.")
+@click.option(
+    "--max-parallel",
+    type=int,
+    default=scheduler.DEFAULT_MAX_PARALLEL,
+    show_default=True,
+    help="Maximum exports running at once.",
+)
+@click.option(
+    "--per-server",
+    type=int,
+    default=scheduler.DEFAULT_PER_SERVER,
+    show_default=True,
+    help="Maximum exports running at once from one server.",
+)
+@click.option(
+    "--per-pool",
+    type=int,
+    default=scheduler.DEFAULT_PER_POOL,
+    show_default=True,
+    help="Maximum exports running at once from one elastic pool.",
+)
+@_profile_option
+@_skip_space_check_option
+@_source_option
+@_via_copy_option
+@_copy_service_objective_option
+@_restart_option
+def export_databases(
+    server_name: str,
+    database_names: tuple[str, ...],
+    export_all: bool,
+    output_dir: str,
+    auth_method: str,
+    username: str | None,
+    max_parallel: int,
+    per_server: int,
+    per_pool: int,
+    profile: str,
+    skip_space_check: bool,
+    source: str,
+    via_copy: bool,
+    copy_service_objective: str | None,
+    restart: bool,
+) -> None:
+    """
+    Exports several databases from a server to bacpacs in parallel.
+
+    With --via-copy, every database is copied at once, and each export starts
+    as soon as its copy is online. If some exports fail, running the command
+    again only retries those.
+    """
+    _check_copy_options(source, via_copy, copy_service_objective)
+    selected = _select_databases(server_name, database_names, export_all, "export")
+    if not selected:
+        return
+
+    if auth_method == "sql" and not username:
+        username = click.prompt("SQL Username")
+    os.makedirs(output_dir, exist_ok=True)
+    sizes = [
+        (
+            db.size_bytes
+            if db.size_bytes is not None
+            else azure_handler.lookup_database_size(server_name, db.name or "")
+        )
+        for db in selected
+    ]
+    space_problems = planning.check_batch_output(sizes, output_dir)
+    copy_names: dict[str, str] = {}
+    jobs: list[scheduler.Job] = []
+    for db, size_bytes in zip(selected, sizes, strict=True):
+        database_name = db.name or ""
+        output_file = os.path.join(output_dir, f"{database_name}.bacpac")
+        selected_profile = profiles.resolve(profile, size_bytes)
+        temp_dir = profiles.default_temp_dir(selected_profile)
+        if size_bytes is not None:
+            preflight = planning.preflight_export(
+                size_bytes, output_file, selected_profile
+            )
+            space_problems += [f"{database_name}: {p}" for p in preflight.problems]
+            temp_dir = preflight.temp_directory
+        try:
+            source_server, source_database = sql_handler.find_source(
+                server_name, database_name, source
+            )
+        except (ValueError, HttpResponseError) as e:
+            raise click.ClickException(str(e)) from e
+        if via_copy:
+            source_database = copies.copy_name(database_name)
+            copy_names[database_name] = source_database
+        command = sql_handler.export_command(
+            source_server,
+            source_database,
+            output_file,
+            auth_method,
+            username,
+            selected_profile,
+            temp_dir,
+            read_only=source != "primary",
+        )
+        if command is None:
+            return
+        jobs.append(
+            scheduler.Job(
+                name=f"{server_name}/{database_name}",
+                action=functools.partial(
+                    scheduler.run_command,
+                    command,
+                    profiles.environment(temp_dir),
+                ),
+                # Limits apply where the reads land, not to the primary.
+                server_name=source_server,
+                elastic_pool=db.elastic_pool if source == "primary" else None,
+                kind="export",
+                output=output_file,
+            )
+        )
+
+    for problem in space_problems:
+        click.echo(f"Warning: {problem}", err=True)
+    if space_problems and not skip_space_check:
+        raise click.ClickException(
+            "Not enough disk space. Free some up, set BACPACMAN_TEMP_DIR, or pass "
+            "--skip-space-check."
+        )
+
+    state = _load_state(os.path.join(output_dir, scheduler.STATE_FILE_NAME), restart)
+    # Copies whose export has not started yet; the export drops its own copy.
+    unused_copies: dict[str, copies.DatabaseCopy] = {}
+    if via_copy:
+        to_copy = [
+            (job, database_name)
+            for job, database_name in zip(jobs, copy_names, strict=True)
+            if not state.is_done(job)
+        ]
+        started = _begin_copies(
+            server_name,
+            {database_name: copy_names[database_name] for _, database_name in to_copy},
+            copy_service_objective,
+        )
+        unused_copies.update((copy.copy_name, copy) for copy in started)
+        for (job, _), copy in zip(to_copy, started, strict=True):
+            job.action = functools.partial(
+                _export_from_copy, unused_copies, copy, job.action
+            )
+
+    try:
+        results = _run_jobs(
+            jobs, scheduler.Limits(max_parallel, per_server, per_pool), state
+        )
+    finally:
+        if unused_copies:
+            # Jobs that never started, e.g. after Ctrl-C, would otherwise leave
+            # their copies behind, still being billed.
+            click.echo(f"Dropping unused copies: {', '.join(unused_copies)}", err=True)
+            try:
+                copies.drop_copies(list(unused_copies.values()))
+            except HttpResponseError as e:
+                click.echo(f"Could not drop every copy: {e}", err=True)
+    if any(not result.succeeded for result in results):
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--server-name", prompt="Server Name", help="The Azure SQL server.")
+@click.option(
+    "--database-name",
+    "database_names",
+    multiple=True,
+    help="A database to clone. May be repeated.",
+)
+@click.option(
+    "--all", "clone_all", is_flag=True, help="Clone every database on the server."
+)
+@click.option(
+    "--target-server",
+    default="localhost",
+    show_default=True,
+    help="The SQL server to import into.",
+)
+@click.option(
+    "--target-suffix",
+    default="",
+    help="Appended to each database name on the target, e.g. '_dev'.",
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(file_okay=False),
+    default=".",
+    show_default=True,
+    help="Where to keep the bacpac files between export and import.",
+)
+@click.option("--keep-bacpacs", is_flag=True, help="Keep the bacpacs after import.")
+@click.option(
+    "--auth",
+    "auth_method",
+    type=click.Choice(["aad", "sql"]),
+    default="aad",
+    show_default=True,
+    help="How sqlpackage authenticates to the Azure server.",
+)
+@click.option("--username", help="The Azure SQL login, with --auth sql.")
+@click.option(
+    "--target-auth",
+    type=click.Choice(["windows", "sql"]),
+    default="windows",
+    show_default=True,
+    help="How sqlpackage authenticates to the target server.",
+)
+@click.option("--target-username", help="The target SQL login, with --target-auth sql.")
+@click.option(
+    "--export-workers",
+    type=int,
+    default=2,
+    show_default=True,
+    help="Exports running at once. Exports are mostly network-bound.",
+)
+@click.option(
+    "--import-workers",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Imports running at once. Imports are disk- and CPU-bound.",
+)
+@click.option(
+    "--per-pool",
+    type=int,
+    default=scheduler.DEFAULT_PER_POOL,
+    show_default=True,
+    help="Maximum exports running at once from one elastic pool.",
+)
+@_profile_option
+@_include_table_option
+@_exclude_table_option
+@_source_option
+@_via_copy_option
+@_copy_service_objective_option
+@_restart_option
+def clone(
+    server_name: str,
+    database_names: tuple[str, ...],
+    clone_all: bool,
+    target_server: str,
+    target_suffix: str,
+    work_dir: str,
+    keep_bacpacs: bool,
+    auth_method: str,
+    username: str | None,
+    target_auth: str,
+    target_username: str | None,
+    export_workers: int,
+    import_workers: int,
+    per_pool: int,
+    profile: str,
+    include_tables: tuple[str, ...],
+    exclude_tables: tuple[str, ...],
+    source: str,
+    via_copy: bool,
+    copy_service_objective: str | None,
+    restart: bool,
+) -> None:
+    """
+    Copies databases from Azure to another server, export and import overlapped.
+
+    Each database is imported as soon as its export finishes, while the next
+    databases are still exporting, so the total time approaches the longer of
+    the two stages rather than their sum.
+    """
+    _check_copy_options(source, via_copy, copy_service_objective)
+    selected = _select_databases(server_name, database_names, clone_all, "clone")
+    if not selected:
+        return
+
+    if auth_method == "sql" and not username:
+        username = click.prompt("SQL Username")
+    if target_auth == "sql" and not target_username:
+        target_username = click.prompt("Target SQL Username")
+    try:
+        if auth_method == "sql" and username:
+            sql_handler.get_password(server_name, username)
+        if target_auth == "sql" and target_username:
+            sql_handler.get_password(target_server, target_username)
+    except keyring.errors.NoKeyringError as e:
+        raise click.ClickException(
+            "No keyring backend found for SQL authentication."
+        ) from e
+
+    os.makedirs(work_dir, exist_ok=True)
+    jobs: list[scheduler.Job] = []
+    for db in selected:
+        database_name = db.name or ""
+        bacpac = os.path.join(work_dir, f"{database_name}.bacpac")
+        target_database = f"{database_name}{target_suffix}"
+        export_name = f"export {server_name}/{database_name}"
+        jobs.append(
+            scheduler.Job(
+                name=export_name,
+                action=functools.partial(
+                    scheduler.export_database,
+                    server_name,
+                    database_name,
+                    bacpac,
+                    auth_method,
+                    username,
+                    profile,
+                    db.size_bytes,
+                    list(include_tables),
+                    list(exclude_tables),
+                    source,
+                    via_copy,
+                    copy_service_objective,
+                ),
+                server_name=server_name,
+                elastic_pool=db.elastic_pool,
+                kind="export",
+                output=bacpac,
+            )
+        )
+        jobs.append(
+            scheduler.Job(
+                name=f"import {target_server}/{target_database}",
+                action=functools.partial(
+                    _import_clone,
+                    bacpac,
+                    target_server,
+                    target_database,
+                    target_auth,
+                    target_username,
+                    profile,
+                    keep_bacpacs,
+                ),
+                depends_on=[export_name],
+                kind="import",
+            )
+        )
+
+    limits = scheduler.Limits(
+        max_parallel=export_workers + import_workers,
+        per_server=export_workers,
+        per_pool=per_pool,
+        per_kind={"export": export_workers, "import": import_workers},
+    )
+    state = _load_state(os.path.join(work_dir, scheduler.STATE_FILE_NAME), restart)
+    results = _run_jobs(jobs, limits, state)
+    if any(not result.succeeded for result in results):
+        sys.exit(1)
+
+
+def _import_clone(
+    bacpac: str,
+    server_name: str,
+    database_name: str,
+    auth_method: str,
+    username: str | None,
+    profile: str,
+    keep_bacpac: bool,
+) -> None:
+    scheduler.import_database(
+        bacpac, server_name, database_name, auth_method, username, profile
+    )
+    if not keep_bacpac:
+        os.remove(bacpac)
+
+
+@cli.command(name="run")
+@click.argument("manifest_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--max-parallel", type=int, help="Override the manifest's max_parallel setting."
+)
+@click.option(
+    "--summary",
+    "summary_file",
+    type=click.Path(dir_okay=False),
+    help="Write a JSON summary here ('-' for stdout). Overrides the manifest.",
+)
+@_restart_option
+def run_manifest(
+    manifest_file: str,
+    max_parallel: int | None,
+    summary_file: str | None,
+    restart: bool,
+) -> None:
+    """
+    Runs the export, import and clone jobs listed in a TOML manifest.
+
+    If some jobs fail, running the manifest again skips the ones that
+    succeeded.
+    """
+    try:
+        loaded = manifest.load(manifest_file)
+    except manifest.ManifestError as e:
+        raise click.ClickException(str(e)) from e
+    if max_parallel is not None:
+        loaded.limits.max_parallel = max_parallel
+
+    # Ask for any missing passwords now, so the jobs can run unattended.
+    for server_name, username in sorted(loaded.logins):
+        try:
+            sql_handler.get_password(server_name, username)
+        except keyring.errors.NoKeyringError as e:
+            raise click.ClickException(
+                "No keyring backend found for SQL authentication."
+            ) from e
+
+    state = _load_state(loaded.state_file, restart)
+    started = time.perf_counter()
+    results = _run_jobs(loaded.jobs, loaded.limits, state)
+    summary = manifest.summarize(results, time.perf_counter() - started)
+
+    summary_file = summary_file or loaded.summary_file
+    if summary_file == "-":
+        click.echo(json.dumps(summary, indent=2))
+    elif summary_file:
+        with open(summary_file, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        click.echo(f"Wrote the run summary to {summary_file}.")
+    if summary["failed"] or summary["skipped"]:
+        sys.exit(1)
+
+
+def _load_state(state_file: str, restart: bool) -> scheduler.RunState:
+    """Opens a batch's run state, forgetting it first with --restart."""
+    state = scheduler.RunState(state_file)
+    if restart:
+        state.clear()
+    elif state.completed:
+        click.echo(
+            f"Resuming an earlier run; jobs already done: {len(state.completed)} "
+            f"({state_file})."
+        )
+    return state
+
+
+def _run_jobs(
+    jobs: list[scheduler.Job],
+    limits: scheduler.Limits,
+    state: scheduler.RunState | None = None,
+) -> list[scheduler.JobResult]:
+    """
+    Runs scheduled jobs, reporting each one as it starts and finishes.
+
+    With a ``state``, jobs that succeeded in an earlier run of the same batch
+    are not run again. Its file is removed once every job has succeeded.
+    """
+    total = len(jobs)
+    finished: list[scheduler.JobResult] = []
+
+    def on_start(job: scheduler.Job) -> None:
+        click.echo(f"Started {job.name}")
+
+    def on_finish(result: scheduler.JobResult) -> None:
+        finished.append(result)
+        prefix = f"[{len(finished)}/{total}]"
+        if result.resumed:
+            click.echo(f"{prefix} Already done {result.job.name}")
+            return
+        line = f"{prefix} {result.status.capitalize()} {result.job.name}"
+        if result.status != "skipped":
+            line += f" in {planning.format_duration(result.elapsed)}"
+        click.echo(f"{line}: {result.error}" if result.error else line)
+
+    started = time.perf_counter()
+    results = scheduler.run_jobs(
+        jobs, limits, on_start=on_start, on_finish=on_finish, state=state
+    )
+    succeeded = sum(result.succeeded for result in results)
+    click.echo(
+        f"{succeeded} of {total} jobs succeeded "
+        f"in {planning.format_duration(time.perf_counter() - started)}."
     )
+    if state is not None:
+        if succeeded == total:
+            state.clear()
+        else:
+            click.echo(
+                f"Progress is saved in {state.path}. Run the same command again "
+                "to resume, or pass --restart to start over."
+            )
+    return results
 
 
 @cli.command()
@@ -76,31 +827,40 @@ def select_subscription(subscription_id: str | None) -> None:
 @cli.command()
 def list_servers() -> None:
     """Lists SQL servers in the selected subscription."""
-    subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
-    if not subscription_id:
+    try:
+        subscription_id = azure_handler.current_subscription_id()
+    except ValueError:
         click.echo("Please select a subscription first using 'select-subscription'.")
         return
 
-    servers = azure_handler.list_servers(subscription_id)
+    servers = list(azure_handler.list_servers(subscription_id))
     if not servers:
         click.echo("No SQL servers found in the selected subscription.")
         return
 
     click.echo("Available SQL servers:")
     for server in servers:
-        click.echo(f"- {server.name}")
+        resource_group_name = azure_handler.resource_group_from_id(server.id or "")
+        click.echo(f"- {server.name} (resource group: {resource_group_name})")
 
 
 @cli.command()
 @click.option("--server-name", prompt="Server Name", help="The name of the SQL server.")
-def list_databases(server_name: str) -> None:
+@click.option(
+    "--resource-group",
+    help="The server's resource group. Skips looking it up from the server list.",
+)
+def list_databases(server_name: str, resource_group: str | None) -> None:
     """Lists databases on a SQL server."""
-    subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
-    if not subscription_id:
+    try:
+        subscription_id = azure_handler.current_subscription_id()
+    except ValueError:
         click.echo("Please select a subscription first using 'select-subscription'.")
         return
 
-    databases = azure_handler.list_databases(subscription_id, server_name)
+    databases = list(
+        azure_handler.list_databases(subscription_id, server_name, resource_group)
+    )
     if not databases:
         click.echo("No databases found on the specified server.")
         return
@@ -110,20 +870,96 @@ def list_databases(server_name: str) -> None:
         click.echo(f"- {db.name}")
 
 
+@cli.command(name="inventory")
+@click.option(
+    "--subscription-id",
+    "subscription_ids",
+    multiple=True,
+    help="Limit discovery to this subscription. May be repeated.",
+)
+@click.option(
+    "--max-workers",
+    type=int,
+    help="Maximum concurrent Azure API calls (default: BACPACMAN_MAX_WORKERS or "
+    f"{inventory.DEFAULT_MAX_WORKERS}).",
+)
+@click.option(
+    "--sequential", is_flag=True, help="Discover one server at a time instead."
+)
+@click.option(
+    "--backend",
+    type=click.Choice(azure_handler.DISCOVERY_BACKENDS),
+    help="Discovery backend (default: BACPACMAN_DISCOVERY_BACKEND or 'arm').",
+)
+def show_inventory(
+    subscription_ids: tuple[str, ...],
+    max_workers: int | None,
+    sequential: bool,
+    backend: str | None,
+) -> None:
+    """Lists every SQL server and database across your subscriptions."""
+    started = time.perf_counter()
+    selected = subscription_ids or None
+    if sequential:
+        result = inventory.collect_inventory_sequential(selected)
+    else:
+        result = inventory.collect_inventory(selected, max_workers, backend)
+    elapsed = time.perf_counter() - started
+
+    for entry in result.servers:
+        click.echo(
+            f"- {entry.server.name} (subscription: {entry.subscription_name}, "
+            f"resource group: {entry.resource_group_name})"
+        )
+        for db in entry.databases:
+            click.echo(f"    - {db.name}")
+    for error in result.errors:
+        click.echo(f"Warning: {error}", err=True)
+    database_count = sum(len(entry.databases) for entry in result.servers)
+    click.echo(
+        f"Found {len(result.servers)} servers and {database_count} databases "
+        f"in {elapsed:.1f}s."
+    )
+
+
 @cli.command()
 @click.option("--input-file", help="The bacpac file to import.")
 @click.option(
     "--server-name", help="The name of the local SQL server (defaults to 'localhost')."
 )
 @click.option("--database-name", help="The name of the target database.")
+@_profile_option
+@_skip_space_check_option
 def import_bacpac(
-    input_file: str | None, server_name: str | None, database_name: str | None
+    input_file: str | None,
+    server_name: str | None,
+    database_name: str | None,
+    profile: str,
+    skip_space_check: bool,
 ) -> None:
     """Imports a bacpac to a local SQL server."""
     if input_file and database_name:
         # If all arguments are provided, run non-interactively
         final_server_name = server_name or "localhost"
-        sql_handler.import_bacpac(input_file, final_server_name, database_name)
+        sql_handler.import_bacpac(
+            input_file,
+            final_server_name,
+            database_name,
+            profile=profile,
+            check_space=not skip_space_check,
+        )
     else:
         # Otherwise, run the interactive workflow
         ui.run_import_workflow(server_name)
+
+
+@cli.group(name="cache")
+def cache_group() -> None:
+    """Manages the local cache of discovered Azure resources."""
+
+
+@cache_group.command(name="clear")
+def clear_cache() -> None:
+    """Deletes the cached subscriptions, servers and databases."""
+    cache.clear()
+    click.echo(f"Cleared the discovery cache in {cache.cache_dir()}.")
@@ -0,0 +1,134 @@
+import contextlib
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+import click
+from azure.core.exceptions import AzureError, ResourceNotFoundError
+from azure.core.polling import LROPoller
+from azure.mgmt.sql.models import Database, DatabaseProperties, Sku
+
+from . import azure_handler
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class DatabaseCopy:
+    """
+    A temporary copy of a database that is being created to export from.
+
+    A copy is transactionally consistent as of the moment it completes, and
+    nothing writes to it while it is exported.
+    """
+
+    subscription_id: str
+    resource_group_name: str
+    server_name: str
+    database_name: str
+    copy_name: str
+    poller: LROPoller[Any]
+
+    def wait(self) -> None:
+        """Blocks until the copy is online. Raises HttpResponseError if it failed."""
+        self.poller.result()
+
+
+def copy_name(database_name: str) -> str:
+    """Returns a unique name for a temporary copy of a database."""
+    return f"{database_name}-bacpacman-{uuid.uuid4().hex[:8]}"
+
+
+def begin_copy(
+    server_name: str,
+    database_name: str,
+    service_objective: str | None = None,
+    name: str | None = None,
+    subscription_id: str | None = None,
+) -> DatabaseCopy:
+    """
+    Starts copying a database on its own server and returns without waiting.
+
+    The copy gets ``service_objective`` (e.g. 'S3' or 'GP_Gen5_8') if given,
+    so the export can read from faster compute than the source has; otherwise
+    it matches the source, including its elastic pool. ``name`` defaults to
+    a new copy_name(), and the subscription to AZURE_SUBSCRIPTION_ID. Raises
+    ValueError if the subscription or server is unknown.
+    """
+    subscription_id = subscription_id or azure_handler.current_subscription_id()
+    resource_group_name = azure_handler.find_resource_group(
+        subscription_id, server_name
+    )
+    if not resource_group_name:
+        raise ValueError(f"Server {server_name} was not found in the subscription.")
+    databases = azure_handler.get_sql_client(subscription_id).databases
+    source = databases.get(resource_group_name, server_name, database_name)
+    parameters = Database(
+        location=source.location,
+        properties=DatabaseProperties(
+            create_mode="Copy",
+            source_database_id=source.id,
+            elastic_pool_id=None if service_objective else source.elastic_pool_id,
+        ),
+        sku=Sku(name=service_objective) if service_objective else None,
+    )
+    name = name or copy_name(database_name)
+    poller = databases.begin_create_or_update(
+        resource_group_name, server_name, name, parameters
+    )
+    return DatabaseCopy(
+        subscription_id=subscription_id,
+        resource_group_name=resource_group_name,
+        server_name=server_name,
+        database_name=database_name,
+        copy_name=name,
+        poller=poller,
+    )
+
+
+def drop_copy(copy: DatabaseCopy) -> None:
+    """Deletes a copy and waits for it to go. A copy that never appeared is fine."""
+    databases = azure_handler.get_sql_client(copy.subscription_id).databases
+    with contextlib.suppress(ResourceNotFoundError):
+        databases.begin_delete(
+            copy.resource_group_name, copy.server_name, copy.copy_name
+        ).result()
+
+
+def drop_copies(database_copies: list[DatabaseCopy]) -> None:
+    """Deletes several copies at once and waits for all of them to go."""
+    pollers = []
+    for copy in database_copies:
+        databases = azure_handler.get_sql_client(copy.subscription_id).databases
+        with contextlib.suppress(ResourceNotFoundError):
+            pollers.append(
+                databases.begin_delete(
+                    copy.resource_group_name, copy.server_name, copy.copy_name
+                )
+            )
+    for poller in pollers:
+        with contextlib.suppress(ResourceNotFoundError):
+            poller.result()
+
+
+def export_from_copy(copy: DatabaseCopy, export: Callable[[], _T]) -> _T:
+    """
+    Waits for a copy, runs ``export`` against it and then drops the copy.
+
+    The copy is dropped even if creating it or the export fails. Failing to
+    drop it is reported rather than raised, so it cannot hide the export's
+    own error.
+    """
+    try:
+        copy.wait()
+        return export()
+    finally:
+        try:
+            drop_copy(copy)
+        except AzureError as e:
+            click.echo(
+                f"Warning: could not drop {copy.copy_name}: {e.message}. "
+                "Delete it by hand.",
+                err=True,
+            )
@@ -0,0 +1,153 @@
+import os
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from azure.core.exceptions import AzureError
+
+from . import azure_handler
+from .azure_handler import SqlDatabase, SqlServer, Subscription
+
+# Upper bound on concurrent management API calls when no cap is configured.
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class InventoryServer:
+    """A SQL server and its databases, as found during discovery."""
+
+    subscription_id: str
+    subscription_name: str | None
+    server: SqlServer
+    resource_group_name: str | None
+    databases: list[SqlDatabase] = field(default_factory=list)
+
+
+@dataclass
+class Inventory:
+    """The merged SQL inventory across subscriptions."""
+
+    servers: list[InventoryServer] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    def sort(self) -> None:
+        """Orders servers and databases by name for stable output."""
+        self.servers.sort(
+            key=lambda s: (s.subscription_name or "", (s.server.name or "").lower())
+        )
+        for entry in self.servers:
+            entry.databases.sort(key=lambda db: (db.name or "").lower())
+
+
+def get_max_workers(max_workers: int | None = None) -> int:
+    """Resolves the concurrency cap from the argument or BACPACMAN_MAX_WORKERS."""
+    if max_workers is None:
+        try:
+            max_workers = int(os.getenv("BACPACMAN_MAX_WORKERS", ""))
+        except ValueError:
+            max_workers = DEFAULT_MAX_WORKERS
+    return max(1, max_workers)
+
+
+def _select_subscriptions(subscription_ids: Iterable[str] | None) -> list[Subscription]:
+    subscriptions = [s for s in azure_handler.list_subscriptions() if s.subscription_id]
+    if subscription_ids is not None:
+        wanted = set(subscription_ids)
+        subscriptions = [s for s in subscriptions if s.subscription_id in wanted]
+    return subscriptions
+
+
+def _new_entry(subscription: Subscription, server: SqlServer) -> InventoryServer:
+    return InventoryServer(
+        subscription_id=subscription.subscription_id or "",
+        subscription_name=subscription.display_name,
+        server=server,
+        resource_group_name=azure_handler.resource_group_from_id(server.id or ""),
+    )
+
+
+def _list_servers(subscription_id: str) -> list[SqlServer]:
+    return list(azure_handler.list_servers(subscription_id))
+
+
+def _list_databases(entry: InventoryServer) -> list[SqlDatabase]:
+    return list(
+        azure_handler.list_databases(
+            entry.subscription_id,
+            entry.server.name or "",
+            entry.resource_group_name,
+        )
+    )
+
+
+def collect_inventory_sequential(
+    subscription_ids: Iterable[str] | None = None,
+) -> Inventory:
+    """Walks every subscription and server one at a time."""
+    inventory = Inventory()
+    for subscription in _select_subscriptions(subscription_ids):
+        try:
+            servers = _list_servers(subscription.subscription_id or "")
+        except AzureError as e:
+            inventory.errors.append(f"{subscription.subscription_id}: {e.message}")
+            continue
+        for server in servers:
+            entry = _new_entry(subscription, server)
+            try:
+                entry.databases = _list_databases(entry)
+            except AzureError as e:
+                inventory.errors.append(f"{server.name}: {e.message}")
+            inventory.servers.append(entry)
+    inventory.sort()
+    return inventory
+
+
+def collect_inventory(
+    subscription_ids: Iterable[str] | None = None,
+    max_workers: int | None = None,
+    backend: str | None = None,
+) -> Inventory:
+    """
+    Discovers servers and databases across subscriptions concurrently.
+
+    Server listings for every subscription and database listings for every
+    server share one thread pool, so at most ``max_workers`` management API
+    calls are in flight at any time. With the "resource-graph" backend the
+    whole inventory comes from Resource Graph queries instead.
+    """
+    if (backend or azure_handler.get_discovery_backend()) == "resource-graph":
+        from . import resource_graph  # Imported here to avoid a circular import.
+
+        return resource_graph.collect_inventory(subscription_ids)
+
+    inventory = Inventory()
+    subscriptions = _select_subscriptions(subscription_ids)
+    with ThreadPoolExecutor(
+        max_workers=get_max_workers(max_workers), thread_name_prefix="inventory"
+    ) as pool:
+        server_jobs: dict[Future[list[SqlServer]], Subscription] = {
+            pool.submit(_list_servers, s.subscription_id or ""): s
+            for s in subscriptions
+        }
+        database_jobs: dict[Future[list[SqlDatabase]], InventoryServer] = {}
+        # Database listings are queued as soon as each subscription's servers
+        # arrive, so they overlap with the remaining server listings.
+        for future in as_completed(server_jobs):
+            subscription = server_jobs[future]
+            try:
+                servers = future.result()
+            except AzureError as e:
+                inventory.errors.append(f"{subscription.subscription_id}: {e.message}")
+                continue
+            for server in servers:
+                entry = _new_entry(subscription, server)
+                inventory.servers.append(entry)
+                database_jobs[pool.submit(_list_databases, entry)] = entry
+        for future in as_completed(database_jobs):
+            entry = database_jobs[future]
+            try:
+                entry.databases = future.result()
+            except AzureError as e:
+                inventory.errors.append(f"{entry.server.name}: {e.message}")
+    inventory.sort()
+    return inventory
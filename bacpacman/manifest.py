@@ -0,0 +1,313 @@
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any
+
+from . import profiles, scheduler, sql_handler
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+JOB_TYPES = ("export", "import", "clone")
+EXPORT_AUTH_METHODS = ("aad", "sql")
+IMPORT_AUTH_METHODS = ("windows", "sql")
+
+SETTINGS_KEYS = frozenset(
+    {
+        "max_parallel",
+        "per_server",
+        "per_pool",
+        "export_workers",
+        "import_workers",
+        "output_dir",
+        "summary",
+        "state",
+    }
+)
+# Keys of a [[jobs]] table, which [defaults] may also set.
+JOB_KEYS = frozenset(
+    {
+        "type",
+        "name",
+        "profile",
+        "depends_on",
+        "server",
+        "database",
+        "output",
+        "auth",
+        "username",
+        "source",
+        "via_copy",
+        "copy_service_objective",
+        "include_tables",
+        "exclude_tables",
+        "elastic_pool",
+        "input",
+        "target_server",
+        "target_database",
+        "target_auth",
+        "target_username",
+    }
+)
+
+
+class ManifestError(Exception):
+    """Raised when a manifest cannot be read or describes invalid jobs."""
+
+
+@dataclass
+class Manifest:
+    """The jobs and settings read from a manifest file."""
+
+    jobs: list[scheduler.Job]
+    limits: scheduler.Limits
+    summary_file: str | None = None
+    logins: set[tuple[str, str]] = field(default_factory=set)
+    # Records finished jobs so an interrupted run can be resumed.
+    state_file: str = scheduler.STATE_FILE_NAME
+    # Names that stand for another job, e.g. a clone's name for its import.
+    aliases: dict[str, str] = field(default_factory=dict)
+
+
+class _Spec:
+    """Reads one [[jobs]] table, falling back to [defaults]."""
+
+    def __init__(
+        self, index: int, table: dict[str, Any], defaults: dict[str, Any]
+    ) -> None:
+        self.index = index
+        self.table = table
+        self.defaults = defaults
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.table.get(key, self.defaults.get(key, default))
+
+    def choice(self, key: str, choices: tuple[str, ...]) -> str:
+        """Returns the value of ``key``, or the first choice if it is not set."""
+        value = self.get(key, choices[0])
+        if value not in choices:
+            raise ManifestError(
+                f"Job {self.index}: '{key}' must be one of {', '.join(choices)}"
+            )
+        return str(value)
+
+    def require(self, key: str) -> str:
+        value = self.get(key)
+        if not isinstance(value, str) or not value:
+            raise ManifestError(f"Job {self.index}: '{key}' is required")
+        return value
+
+
+def _string_list(spec: _Spec, key: str) -> list[str]:
+    value = spec.get(key, [])
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ManifestError(f"Job {spec.index}: '{key}' must be a list of strings")
+    return list(value)
+
+
+def _check_keys(table: dict[str, Any], known: frozenset[str], where: str) -> None:
+    unknown = sorted(set(table) - known)
+    if unknown:
+        raise ManifestError(f"{where}: unknown key '{unknown[0]}'")
+
+
+def _positive_int(settings: dict[str, Any], key: str, default: int) -> int:
+    value = settings.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ManifestError(f"Setting '{key}' must be a positive integer")
+    return value
+
+
+def _parse_job(
+    spec: _Spec, base_dir: str, output_dir: str, manifest: Manifest
+) -> list[scheduler.Job]:
+    job_type = spec.get("type")
+    if job_type not in JOB_TYPES:
+        raise ManifestError(
+            f"Job {spec.index}: 'type' must be one of {', '.join(JOB_TYPES)}"
+        )
+    profile = spec.get("profile")
+    try:
+        profiles.resolve(profile)
+    except ValueError as e:
+        raise ManifestError(f"Job {spec.index}: {e}") from e
+    depends_on = _string_list(spec, "depends_on")
+
+    def path(value: str) -> str:
+        return os.path.join(base_dir, os.path.expanduser(value))
+
+    if job_type == "import":
+        input_file = path(spec.require("input"))
+        server = spec.get("target_server", "localhost")
+        database = (
+            spec.get("target_database")
+            or os.path.splitext(os.path.basename(input_file))[0]
+        )
+        auth = spec.choice("target_auth", IMPORT_AUTH_METHODS)
+        username = spec.get("target_username")
+        if auth == "sql" and username:
+            manifest.logins.add((server, username))
+        return [
+            scheduler.Job(
+                name=spec.get("name") or f"import {server}/{database}",
+                action=lambda: scheduler.import_database(
+                    input_file, server, database, auth, username, profile
+                ),
+                server_name=server,
+                depends_on=list(depends_on),
+                kind="import",
+            )
+        ]
+
+    server = spec.require("server")
+    database = spec.require("database")
+    output = path(spec.get("output") or os.path.join(output_dir, f"{database}.bacpac"))
+    auth = spec.choice("auth", EXPORT_AUTH_METHODS)
+    username = spec.get("username")
+    if auth == "sql" and username:
+        manifest.logins.add((server, username))
+    source = spec.get("source", "primary")
+    if source not in sql_handler.EXPORT_SOURCES:
+        raise ManifestError(
+            f"Job {spec.index}: 'source' must be one of "
+            f"{', '.join(sql_handler.EXPORT_SOURCES)}"
+        )
+    via_copy = spec.get("via_copy", False)
+    if not isinstance(via_copy, bool):
+        raise ManifestError(f"Job {spec.index}: 'via_copy' must be true or false")
+    if via_copy and source != "primary":
+        raise ManifestError(f"Job {spec.index}: 'via_copy' reads from the copy")
+    copy_service_objective = spec.get("copy_service_objective")
+    include_tables = _string_list(spec, "include_tables")
+    exclude_tables = _string_list(spec, "exclude_tables")
+    name = spec.get("name") or f"{job_type} {server}/{database}"
+    export_job = scheduler.Job(
+        name=name if job_type == "export" else f"{name}: export",
+        action=lambda: scheduler.export_database(
+            server,
+            database,
+            output,
+            auth,
+            username,
+            profile,
+            include_tables=include_tables,
+            exclude_tables=exclude_tables,
+            source=source,
+            via_copy=via_copy,
+            copy_service_objective=copy_service_objective,
+        ),
+        server_name=server,
+        elastic_pool=spec.get("elastic_pool"),
+        depends_on=list(depends_on),
+        kind="export",
+        output=output,
+    )
+    if job_type == "export":
+        return [export_job]
+
+    target_server = spec.get("target_server", "localhost")
+    target_database = spec.get("target_database") or database
+    target_auth = spec.choice("target_auth", IMPORT_AUTH_METHODS)
+    target_username = spec.get("target_username")
+    if target_auth == "sql" and target_username:
+        manifest.logins.add((target_server, target_username))
+    import_job = scheduler.Job(
+        name=f"{name}: import",
+        action=lambda: scheduler.import_database(
+            output,
+            target_server,
+            target_database,
+            target_auth,
+            target_username,
+            profile,
+        ),
+        server_name=target_server,
+        depends_on=[export_job.name],
+        kind="import",
+    )
+    manifest.aliases[name] = import_job.name
+    return [export_job, import_job]
+
+
+def load(path: str) -> Manifest:
+    """Reads a manifest file. Raises ManifestError if it is invalid."""
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except OSError as e:
+        raise ManifestError(f"Cannot read {path}: {e}") from e
+    except tomllib.TOMLDecodeError as e:
+        raise ManifestError(f"Invalid TOML in {path}: {e}") from e
+
+    settings = data.get("settings", {})
+    defaults = data.get("defaults", {})
+    tables = data.get("jobs", [])
+    if not isinstance(tables, list) or not tables:
+        raise ManifestError(f"{path} has no [[jobs]]")
+    _check_keys(settings, SETTINGS_KEYS, "[settings]")
+    _check_keys(defaults, JOB_KEYS, "[defaults]")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    limits = scheduler.Limits(
+        max_parallel=_positive_int(
+            settings, "max_parallel", scheduler.DEFAULT_MAX_PARALLEL
+        ),
+        per_server=_positive_int(settings, "per_server", scheduler.DEFAULT_PER_SERVER),
+        per_pool=_positive_int(settings, "per_pool", scheduler.DEFAULT_PER_POOL),
+        per_kind={
+            kind: _positive_int(settings, f"{kind}_workers", 1)
+            for kind in ("export", "import")
+            if f"{kind}_workers" in settings
+        },
+    )
+    summary_file = settings.get("summary")
+    state_file = settings.get("state") or (
+        os.path.splitext(os.path.basename(path))[0] + ".state.json"
+    )
+    manifest = Manifest(
+        jobs=[],
+        limits=limits,
+        summary_file=os.path.join(base_dir, summary_file) if summary_file else None,
+        state_file=os.path.join(base_dir, state_file),
+    )
+    output_dir = settings.get("output_dir", ".")
+    for index, table in enumerate(tables, start=1):
+        _check_keys(table, JOB_KEYS, f"Job {index}")
+        spec = _Spec(index, table, defaults)
+        manifest.jobs.extend(_parse_job(spec, base_dir, output_dir, manifest))
+    for job in manifest.jobs:
+        # Depending on a clone means waiting for its import.
+        job.depends_on = [manifest.aliases.get(d, d) for d in job.depends_on]
+
+    try:
+        scheduler.check_dependencies(manifest.jobs)
+    except ValueError as e:
+        raise ManifestError(str(e)) from e
+    return manifest
+
+
+def summarize(results: list[scheduler.JobResult], elapsed: float) -> dict[str, Any]:
+    """Returns a JSON-serializable summary of a run."""
+    counts = {status: 0 for status in ("succeeded", "failed", "skipped")}
+    for result in results:
+        counts[result.status] += 1
+    return {
+        **counts,
+        "elapsed_seconds": round(elapsed, 3),
+        "jobs": [
+            {
+                "name": result.job.name,
+                "type": result.job.kind,
+                "server": result.job.server_name,
+                "status": result.status,
+                "resumed": result.resumed,
+                "elapsed_seconds": round(result.elapsed, 3),
+                "error": result.error,
+            }
+            for result in results
+        ],
+    }
@@ -0,0 +1,211 @@
+import asyncio
+import contextlib
+import threading
+from collections.abc import Callable, Iterable
+from typing import Generic, TypeVar
+
+from prompt_toolkit.application import Application
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.filters import IsDone
+from prompt_toolkit.formatted_text import StyleAndTextTuples
+from prompt_toolkit.key_binding import KeyBindings, KeyPressEvent
+from prompt_toolkit.layout import ConditionalContainer, HSplit, Layout, Window
+from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.layout.dimension import Dimension
+
+from .config import custom_style
+
+_T = TypeVar("_T")
+
+# Rows of choices visible at once; the list scrolls to follow the pointer.
+MAX_VISIBLE_CHOICES = 15
+
+# Seconds the pointer must rest on a choice before on_highlight is called, so
+# scrolling through a long list does not trigger work for every row passed.
+HIGHLIGHT_DELAY = 0.3
+
+
+class NoChoicesError(Exception):
+    """Raised when a streamed selection finishes without yielding any choices."""
+
+
+class _StreamState(Generic[_T]):
+    """Choices received so far, shared between the loader and the prompt."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.choices: list[_T] = []
+        self.pointer = 0
+        self.loading = True
+        self.error: Exception | None = None
+        self.answer: _T | None = None
+
+
+def stream_select(
+    message: str,
+    items: Iterable[_T],
+    title: Callable[[_T], str],
+    on_highlight: Callable[[_T], None] | None = None,
+) -> _T | None:
+    """
+    Asks the user to pick one of ``items`` while they are still being fetched.
+
+    The prompt opens at once and choices are appended as ``items`` yields them,
+    so the first page of an SDK pager can be picked from without waiting for
+    the rest. Returns None if the user cancels. Raises NoChoicesError if
+    ``items`` is empty, or the loader's exception if it fails before yielding
+    anything.
+
+    ``on_highlight`` is called on the event loop with the choice under the
+    pointer once it has rested there for HIGHLIGHT_DELAY seconds.
+    """
+    state: _StreamState[_T] = _StreamState()
+    highlight_timer: list[asyncio.TimerHandle] = []
+
+    def schedule_highlight() -> None:
+        if on_highlight is None:
+            return
+        for timer in highlight_timer:
+            timer.cancel()
+        highlight_timer.clear()
+        with state.lock:
+            if not state.choices:
+                return
+            choice = state.choices[state.pointer]
+        highlight_timer.append(
+            asyncio.get_running_loop().call_later(HIGHLIGHT_DELAY, on_highlight, choice)
+        )
+
+    def get_header() -> StyleAndTextTuples:
+        tokens: StyleAndTextTuples = [
+            ("class:qmark", "?"),
+            ("class:question", f" {message} "),
+        ]
+        if state.answer is not None:
+            tokens.append(("class:answer", title(state.answer)))
+        else:
+            tokens.append(("class:instruction", "(Use arrow keys)"))
+        return tokens
+
+    def get_choices() -> StyleAndTextTuples:
+        tokens: StyleAndTextTuples = []
+        with state.lock:
+            for i, choice in enumerate(state.choices):
+                if i == state.pointer:
+                    tokens.append(("class:pointer", " » "))
+                    tokens.append(("class:highlighted", title(choice)))
+                else:
+                    tokens.append(("class:text", f"   {title(choice)}"))
+                tokens.append(("", "\n"))
+        return tokens[:-1]
+
+    def get_footer() -> StyleAndTextTuples:
+        with state.lock:
+            count = len(state.choices)
+        if state.loading:
+            return [("class:instruction", f"   Loading... {count} found so far")]
+        if state.error is not None:
+            return [("class:instruction", f"   Stopped loading: {state.error}")]
+        return []
+
+    bindings = KeyBindings()
+
+    def move(offset: int) -> None:
+        with state.lock:
+            if state.choices:
+                state.pointer = (state.pointer + offset) % len(state.choices)
+        schedule_highlight()
+
+    @bindings.add("up", eager=True)
+    @bindings.add("k", eager=True)
+    @bindings.add("c-p", eager=True)
+    def _up(event: KeyPressEvent) -> None:
+        move(-1)
+
+    @bindings.add("down", eager=True)
+    @bindings.add("j", eager=True)
+    @bindings.add("c-n", eager=True)
+    def _down(event: KeyPressEvent) -> None:
+        move(1)
+
+    @bindings.add("enter", eager=True)
+    def _select(event: KeyPressEvent) -> None:
+        with state.lock:
+            if not state.choices:
+                return
+            state.answer = state.choices[state.pointer]
+        event.app.exit(result=state.answer)
+
+    @bindings.add("c-c", eager=True)
+    @bindings.add("c-q", eager=True)
+    def _cancel(event: KeyPressEvent) -> None:
+        event.app.exit(result=None)
+
+    @bindings.add("<any>")
+    def _ignore(event: KeyPressEvent) -> None:
+        """Disallow inserting other text."""
+
+    choices_control = FormattedTextControl(
+        get_choices,
+        get_cursor_position=lambda: Point(0, state.pointer),
+        show_cursor=False,
+    )
+    app: Application[_T | None] = Application(
+        layout=Layout(
+            HSplit(
+                [
+                    Window(FormattedTextControl(get_header), height=1),
+                    ConditionalContainer(
+                        Window(
+                            choices_control,
+                            height=Dimension(max=MAX_VISIBLE_CHOICES),
+                        ),
+                        filter=~IsDone(),
+                    ),
+                    ConditionalContainer(
+                        Window(FormattedTextControl(get_footer), height=1),
+                        filter=~IsDone(),
+                    ),
+                ]
+            )
+        ),
+        key_bindings=bindings,
+        style=custom_style,
+    )
+
+    def finish() -> None:
+        # Runs on the event loop once the loader is exhausted.
+        if state.choices or app.is_done:
+            return
+        app.exit(exception=state.error or NoChoicesError(message))
+
+    def load(loop: asyncio.AbstractEventLoop) -> None:
+        def call_on_loop(callback: Callable[[], None]) -> None:
+            # The loop is closed if the user answered before loading finished.
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(callback)
+
+        try:
+            for item in items:
+                with state.lock:
+                    state.choices.append(item)
+                    first = len(state.choices) == 1
+                if first:
+                    # The first choice is highlighted as soon as it arrives.
+                    call_on_loop(schedule_highlight)
+                app.invalidate()
+        except Exception as e:
+            state.error = e
+        finally:
+            state.loading = False
+            app.invalidate()
+            call_on_loop(finish)
+
+    def start_loader() -> None:
+        # Called from inside the running event loop, before the first render.
+        loop = asyncio.get_running_loop()
+        threading.Thread(
+            target=load, args=(loop,), name="stream-select", daemon=True
+        ).start()
+
+    return app.run(pre_run=start_loader)
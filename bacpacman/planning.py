@@ -0,0 +1,235 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+
+from . import profiles
+from .azure_handler import DatabaseRecord
+
+# A .bacpac is a zip of the schema and BCP-format table data. Real ratios vary
+# with the data; this one errs on the large side so the space check is safe.
+BACPAC_COMPRESSION_RATIO = 0.35
+
+# Rough export throughput, in bytes of used database space per second, by
+# service tier. Exports from low tiers are throttled by their DTU/vCore limits.
+EXPORT_THROUGHPUT_BY_TIER: dict[str, float] = {
+    "basic": 2 * 1024**2,
+    "standard": 6 * 1024**2,
+    "premium": 25 * 1024**2,
+    "generalpurpose": 15 * 1024**2,
+    "businesscritical": 25 * 1024**2,
+    "hyperscale": 25 * 1024**2,
+}
+DEFAULT_EXPORT_THROUGHPUT = 8 * 1024**2
+
+
+# Headroom added to every space requirement, for logs, indexes and estimate error.
+SPACE_MARGIN = 1.1
+
+
+@dataclass
+class ExportPlan:
+    """Size and duration estimates for exporting one database."""
+
+    database_bytes: float
+    estimated_bacpac_bytes: float
+    estimated_seconds: float
+
+
+@dataclass
+class Preflight:
+    """
+    The disk space a run needs, where it will go and what is wrong with it.
+
+    ``temp_directory`` is the scratch directory chosen for sqlpackage's table
+    data, or None to leave sqlpackage on its default.
+    """
+
+    output_directory: str | None = None
+    output_needed: float = 0
+    output_free: int = 0
+    temp_directory: str | None = None
+    temp_needed: float = 0
+    temp_free: int = 0
+    problems: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def format_size(num_bytes: float) -> str:
+    """Formats a byte count for display, e.g. '12.3 GB'."""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_duration(seconds: float) -> str:
+    """Formats a duration for display, e.g. '1h 05m'."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {secs:02d}s"
+    return f"{secs}s"
+
+
+def describe_database(database: DatabaseRecord) -> str:
+    """Returns a one-line picker title with a database's size and SKU."""
+    details: list[str] = []
+    if database.size_bytes is not None:
+        size = format_size(database.size_bytes)
+        if database.max_size_bytes:
+            size += f" / {format_size(database.max_size_bytes)}"
+        details.append(size)
+    if database.sku:
+        details.append(database.sku)
+    if database.elastic_pool:
+        details.append(f"pool: {database.elastic_pool}")
+    name = database.name or "Unnamed"
+    return f"{name}  ({', '.join(details)})" if details else name
+
+
+def export_throughput(tier: str | None) -> float:
+    """Returns the assumed export throughput for a service tier."""
+    return EXPORT_THROUGHPUT_BY_TIER.get(
+        (tier or "").lower(), DEFAULT_EXPORT_THROUGHPUT
+    )
+
+
+def plan_export(database: DatabaseRecord) -> ExportPlan | None:
+    """Estimates an export of the database, or None if its size is unknown."""
+    if database.size_bytes is None:
+        return None
+    return ExportPlan(
+        database_bytes=database.size_bytes,
+        estimated_bacpac_bytes=database.size_bytes * BACPAC_COMPRESSION_RATIO,
+        estimated_seconds=database.size_bytes / export_throughput(database.tier),
+    )
+
+
+def bacpac_contents_size(input_file: str) -> int | None:
+    """Returns the uncompressed size of a bacpac's entries, or None if unreadable."""
+    try:
+        with zipfile.ZipFile(input_file) as bacpac:
+            return sum(entry.file_size for entry in bacpac.infolist())
+    except (OSError, zipfile.BadZipFile):
+        return None
+
+
+def _existing_directory(path: str) -> str:
+    """Returns the nearest existing ancestor of a path, to measure its volume."""
+    path = os.path.abspath(path)
+    while not os.path.isdir(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+def _free_space(path: str) -> int:
+    try:
+        return shutil.disk_usage(_existing_directory(path)).free
+    except OSError:
+        return 0
+
+
+def _same_volume(first: str, second: str) -> bool:
+    try:
+        return (
+            os.stat(_existing_directory(first)).st_dev
+            == os.stat(_existing_directory(second)).st_dev
+        )
+    except OSError:
+        return False
+
+
+def candidate_temp_dirs() -> list[str]:
+    """Returns BACPACMAN_TEMP_DIR's existing directories, then the system one."""
+    candidates = [path for path in profiles.temp_dirs() if os.path.isdir(path)]
+    system = tempfile.gettempdir()
+    return candidates + [system] if system not in candidates else candidates
+
+
+def _choose_temp_dir(
+    preflight: Preflight, needed: float, profile: profiles.Profile
+) -> None:
+    """Picks the first, and so fastest, temp directory with room for ``needed``."""
+    if needed <= 0:
+        preflight.temp_directory = profiles.default_temp_dir(profile)
+        return
+    preflight.temp_needed = needed
+    chosen: tuple[str, int] | None = None
+    for candidate in candidate_temp_dirs():
+        free = _free_space(candidate)
+        if preflight.output_directory and _same_volume(
+            candidate, preflight.output_directory
+        ):
+            # The bacpac and the temp data compete for the same space.
+            free -= int(preflight.output_needed)
+        if free >= needed:
+            chosen = (candidate, free)
+            break
+        if chosen is None or free > chosen[1]:
+            chosen = (candidate, free)
+    assert chosen is not None
+    directory, preflight.temp_free = chosen
+    # Leave sqlpackage on its default when that is what was chosen.
+    preflight.temp_directory = None if directory == tempfile.gettempdir() else directory
+    if preflight.temp_free < needed:
+        preflight.problems.append(
+            f"sqlpackage may need about {format_size(needed)} of temp space, but "
+            f"the roomiest temp directory, {directory}, has "
+            f"{format_size(max(preflight.temp_free, 0))} free. Set "
+            "BACPACMAN_TEMP_DIR to a larger volume."
+        )
+
+
+def preflight_export(
+    database_bytes: float, output_file: str, profile: profiles.Profile
+) -> Preflight:
+    """Checks there is room for an export's bacpac and its temp table data."""
+    output_directory = os.path.dirname(os.path.abspath(output_file))
+    needed = database_bytes * BACPAC_COMPRESSION_RATIO * SPACE_MARGIN
+    preflight = Preflight(
+        output_directory=output_directory,
+        output_needed=needed,
+        output_free=_free_space(output_directory),
+    )
+    if preflight.output_free < needed:
+        preflight.problems.append(
+            f"The bacpac may need about {format_size(needed)}, but only "
+            f"{format_size(preflight.output_free)} is free in {output_directory}."
+        )
+    temp_needed = 0.0 if profile.buffers_in_memory else database_bytes * SPACE_MARGIN
+    _choose_temp_dir(preflight, temp_needed, profile)
+    return preflight
+
+
+def check_batch_output(sizes: list[float | None], output_directory: str) -> list[str]:
+    """Checks one directory has room for the bacpacs of several databases."""
+    needed = sum(size for size in sizes if size is not None)
+    needed *= BACPAC_COMPRESSION_RATIO * SPACE_MARGIN
+    free = _free_space(output_directory)
+    if free >= needed:
+        return []
+    return [
+        f"The bacpacs may need about {format_size(needed)} in total, but only "
+        f"{format_size(free)} is free in {os.path.abspath(output_directory)}."
+    ]
+
+
+def preflight_import(input_file: str, profile: profiles.Profile) -> Preflight:
+    """Checks there is room for an import's temp data, from the bacpac's contents."""
+    preflight = Preflight()
+    contents = bacpac_contents_size(input_file)
+    if contents is None:
+        preflight.temp_directory = profiles.default_temp_dir(profile)
+        return preflight
+    temp_needed = 0.0 if profile.buffers_in_memory else contents * SPACE_MARGIN
+    _choose_temp_dir(preflight, temp_needed, profile)
+    return preflight
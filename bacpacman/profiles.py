@@ -0,0 +1,135 @@
+import os
+from dataclasses import dataclass, field
+
+# Databases below this size are small enough to buffer table data in memory.
+SMALL_DATABASE_BYTES = 1024**3
+
+# Databases from this size up get long timeouts and spill to BACPACMAN_TEMP_DIR.
+LARGE_DATABASE_BYTES = 50 * 1024**3
+
+AUTO = "auto"
+
+
+@dataclass(frozen=True)
+class Profile:
+    """A named set of sqlpackage properties for exports and imports."""
+
+    name: str
+    description: str
+    export_properties: dict[str, str] = field(default_factory=dict)
+    import_properties: dict[str, str] = field(default_factory=dict)
+    # Whether to point TempDirectoryForTableData at BACPACMAN_TEMP_DIR.
+    use_temp_dir: bool = False
+
+    @property
+    def buffers_in_memory(self) -> bool:
+        """Whether table data is held in memory rather than in temp files."""
+        return self.export_properties.get("Storage") == "Memory"
+
+
+PROFILES: dict[str, Profile] = {
+    profile.name: profile
+    for profile in (
+        Profile("default", "sqlpackage's own defaults."),
+        Profile(
+            "small",
+            "Buffers table data in memory; for databases under 1 GB.",
+            export_properties={"Storage": "Memory"},
+            import_properties={"Storage": "Memory"},
+        ),
+        Profile(
+            "medium",
+            "Buffers table data on disk with longer timeouts.",
+            export_properties={"Storage": "File", "CommandTimeout": "600"},
+            import_properties={"Storage": "File", "CommandTimeout": "600"},
+        ),
+        Profile(
+            "large",
+            "Spills to BACPACMAN_TEMP_DIR with no long-running command timeout.",
+            export_properties={
+                "Storage": "File",
+                "CommandTimeout": "3600",
+                "LongRunningCommandTimeout": "0",
+            },
+            import_properties={
+                "Storage": "File",
+                "CommandTimeout": "3600",
+                "LongRunningCommandTimeout": "0",
+                "RebuildIndexesOfflineForDataPhase": "True",
+            },
+            use_temp_dir=True,
+        ),
+    )
+}
+
+PROFILE_NAMES = (AUTO, *PROFILES)
+
+
+def temp_dirs() -> list[str]:
+    """
+    Returns the scratch directories for table data, fastest first.
+
+    BACPACMAN_TEMP_DIR holds one or more directories separated by os.pathsep,
+    listed in order of preference.
+    """
+    value = os.getenv("BACPACMAN_TEMP_DIR", "")
+    return [path for path in value.split(os.pathsep) if path]
+
+
+def default_temp_dir(profile: Profile) -> str | None:
+    """Returns the temp directory a profile uses when no preflight chose one."""
+    configured = [path for path in temp_dirs() if os.path.isdir(path)]
+    return configured[0] if profile.use_temp_dir and configured else None
+
+
+def select_profile(size_bytes: float | None) -> Profile:
+    """Picks a profile for a database of the given size, if it is known."""
+    if size_bytes is None:
+        return PROFILES["default"]
+    if size_bytes < SMALL_DATABASE_BYTES:
+        return PROFILES["small"]
+    if size_bytes < LARGE_DATABASE_BYTES:
+        return PROFILES["medium"]
+    return PROFILES["large"]
+
+
+def resolve(name: str | None, size_bytes: float | None = None) -> Profile:
+    """
+    Returns the named profile, or picks one by size for None or 'auto'.
+
+    Raises ValueError for an unknown profile name.
+    """
+    if name is None or name == AUTO:
+        return select_profile(size_bytes)
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown sqlpackage profile '{name}'. "
+            f"Choose one of: {', '.join(PROFILE_NAMES)}"
+        ) from None
+
+
+def export_arguments(profile: Profile, temp_dir: str | None = None) -> list[str]:
+    """Returns the /p: arguments a profile adds to an export."""
+    properties = dict(profile.export_properties)
+    if temp_dir:
+        properties["TempDirectoryForTableData"] = temp_dir
+    return [f"/p:{key}={value}" for key, value in properties.items()]
+
+
+def import_arguments(profile: Profile) -> list[str]:
+    """Returns the /p: arguments a profile adds to an import."""
+    return [f"/p:{key}={value}" for key, value in profile.import_properties.items()]
+
+
+def environment(temp_dir: str | None) -> dict[str, str] | None:
+    """
+    Returns the environment for sqlpackage, or None to inherit ours.
+
+    Imports have no TempDirectoryForTableData property, so sqlpackage's own
+    temp directory is pointed at the chosen one as well.
+    """
+    if not temp_dir:
+        return None
+    return {**os.environ, "TMP": temp_dir, "TEMP": temp_dir, "TMPDIR": temp_dir}
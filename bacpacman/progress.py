@@ -0,0 +1,124 @@
+import contextlib
+import os
+import shutil
+import sys
+import time
+
+import questionary
+
+from .planning import format_duration, format_size
+from .sqlpackage import OutputLine, PhaseStarted, ProgressEvent, TableStarted
+
+
+class ProgressDisplay:
+    """
+    Shows sqlpackage progress events in the terminal.
+
+    Phases and finished tables are printed as permanent lines. On a terminal, a
+    status line below them is redrawn with the current table, elapsed time and,
+    when the output file is known, the bytes written, throughput and an ETA
+    against ``estimated_bytes``.
+    """
+
+    def __init__(
+        self,
+        output_file: str | None = None,
+        estimated_bytes: float | None = None,
+        final_file: str | None = None,
+    ) -> None:
+        self.output_file = output_file
+        self.final_file = final_file
+        self.estimated_bytes = estimated_bytes
+        self.started = time.monotonic()
+        self._wall_started = time.time()
+        self.tables = 0
+        self._table: str | None = None
+        self._table_started = 0.0
+        self._table_start_bytes = 0
+        self._last_written = 0
+        self._data_started: float | None = None
+        self._status_shown = False
+        self._live = sys.stdout.isatty()
+
+    def __call__(self, event: ProgressEvent) -> None:
+        if isinstance(event, TableStarted):
+            self._finish_table()
+            if self._data_started is None:
+                self._data_started = time.monotonic()
+            self.tables += 1
+            self._table = event.table
+            self._table_started = time.monotonic()
+            self._table_start_bytes = self._written()
+        elif isinstance(event, PhaseStarted):
+            self._finish_table()
+            self._print(event.message, "bold")
+        elif isinstance(event, OutputLine):
+            self._print(event.text, "fg:yellow")
+        self._draw_status()
+
+    def close(self) -> None:
+        """Prints the last table and removes the status line."""
+        self._finish_table()
+        self._clear_status()
+
+    def _written(self) -> int:
+        if not self.output_file:
+            return 0
+        try:
+            self._last_written = os.path.getsize(self.output_file)
+        except OSError:
+            # Not created yet, or renamed to final_file once the export succeeded
+            # (an older file there from before this run doesn't count).
+            with contextlib.suppress(OSError):
+                if (
+                    self.final_file
+                    and os.path.getmtime(self.final_file) >= self._wall_started
+                ):
+                    self._last_written = os.path.getsize(self.final_file)
+        return self._last_written
+
+    def _finish_table(self) -> None:
+        if self._table is None:
+            return
+        seconds = time.monotonic() - self._table_started
+        line = f"  {self._table}  {format_duration(seconds)}"
+        if self.output_file:
+            written = self._written() - self._table_start_bytes
+            line += f"  {format_size(written)}"
+            if seconds > 0:
+                line += f"  {format_size(written / seconds)}/s"
+        self._table = None
+        self._print(line)
+
+    def _status(self) -> str:
+        elapsed = time.monotonic() - self.started
+        parts = [format_duration(elapsed)]
+        if self._table is not None:
+            parts.append(f"table {self.tables}: {self._table}")
+        written = self._written()
+        if written and self._data_started is not None:
+            rate = written / max(time.monotonic() - self._data_started, 1e-3)
+            parts.append(f"{format_size(written)} at {format_size(rate)}/s")
+            if self.estimated_bytes and rate > 0:
+                remaining = max(self.estimated_bytes - written, 0) / rate
+                parts.append(f"ETA {format_duration(remaining)}")
+        return " | ".join(parts)
+
+    def _draw_status(self) -> None:
+        if not self._live:
+            return
+        width = shutil.get_terminal_size().columns - 1
+        sys.stdout.write("\r" + self._status()[:width].ljust(width))
+        sys.stdout.flush()
+        self._status_shown = True
+
+    def _clear_status(self) -> None:
+        if self._status_shown:
+            width = shutil.get_terminal_size().columns - 1
+            sys.stdout.write("\r" + " " * width + "\r")
+            sys.stdout.flush()
+            self._status_shown = False
+
+    def _print(self, text: str, style: str | None = None) -> None:
+        self._clear_status()
+        questionary.print(text, style=style)
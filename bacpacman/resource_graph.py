@@ -0,0 +1,156 @@
+from collections.abc import Iterable, Iterator
+from typing import Any, cast
+
+from azure.core.exceptions import AzureError
+from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
+
+from . import azure_handler
+from .azure_handler import DatabaseRecord, ServerRecord, SqlDatabase, SqlServer
+from .inventory import Inventory, InventoryServer
+
+# Rows requested per page; Resource Graph caps this at 1000.
+PAGE_SIZE = 1000
+
+_SQL_RESOURCES_QUERY = """
+resources
+| where type =~ 'microsoft.sql/servers'
+    or type =~ 'microsoft.sql/servers/databases'
+| project id, name, type, subscriptionId, resourceGroup, sku,
+    maxSizeBytes = properties.maxSizeBytes,
+    elasticPoolId = properties.elasticPoolId
+| order by id asc
+"""
+
+_SUBSCRIPTIONS_QUERY = """
+resourcecontainers
+| where type =~ 'microsoft.resources/subscriptions'
+| project subscriptionId, name
+"""
+
+
+def _quote(value: str) -> str:
+    """Quotes a string literal for a Kusto query."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def query(
+    query_text: str, subscription_ids: Iterable[str] | None = None
+) -> Iterator[dict[str, Any]]:
+    """Runs a Resource Graph query, following skip tokens across pages."""
+    client = azure_handler.get_resource_graph_client()
+    subscriptions = list(subscription_ids) if subscription_ids is not None else None
+    skip_token: str | None = None
+    while True:
+        response = client.resources(
+            QueryRequest(
+                query=query_text,
+                subscriptions=subscriptions,
+                options=QueryRequestOptions(
+                    skip_token=skip_token,
+                    top=PAGE_SIZE,
+                    result_format="objectArray",
+                ),
+            )
+        )
+        # With the objectArray format each row is a dict keyed by column name.
+        yield from cast(list[dict[str, Any]], response.data or [])
+        skip_token = response.skip_token
+        if not skip_token:
+            return
+
+
+def _last_segment(resource_id: str) -> str:
+    return resource_id.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _database_record(row: dict[str, Any]) -> DatabaseRecord:
+    sku = row.get("sku") or {}
+    elastic_pool_id = row.get("elasticPoolId")
+    return DatabaseRecord(
+        name=_last_segment(row["id"]),
+        id=row["id"],
+        max_size_bytes=row.get("maxSizeBytes"),
+        sku=sku.get("name"),
+        tier=sku.get("tier"),
+        elastic_pool=_last_segment(elastic_pool_id) if elastic_pool_id else None,
+    )
+
+
+def _server_name_from_database_id(database_id: str) -> str | None:
+    parts = database_id.split("/")
+    for i, part in enumerate(parts[:-1]):
+        if part.lower() == "servers":
+            return parts[i + 1]
+    return None
+
+
+def list_servers(subscription_id: str) -> list[SqlServer]:
+    """Lists the SQL servers in a subscription with one Resource Graph query."""
+    rows = query(
+        "resources | where type =~ 'microsoft.sql/servers' "
+        "| project id, name | order by name asc",
+        [subscription_id],
+    )
+    servers: list[SqlServer] = [ServerRecord(row["name"], row["id"]) for row in rows]
+    return servers
+
+
+def list_databases(subscription_id: str, server_name: str) -> list[SqlDatabase]:
+    """Lists the databases on a SQL server with one Resource Graph query."""
+    rows = query(
+        "resources | where type =~ 'microsoft.sql/servers/databases' "
+        f"| where id contains {_quote('/servers/' + server_name + '/')} "
+        "| project id, name, sku, maxSizeBytes = properties.maxSizeBytes, "
+        "elasticPoolId = properties.elasticPoolId | order by name asc",
+        [subscription_id],
+    )
+    databases: list[SqlDatabase] = [
+        _database_record(row)
+        for row in rows
+        if (_server_name_from_database_id(row["id"]) or "").lower()
+        == server_name.lower()
+    ]
+    return databases
+
+
+def collect_inventory(subscription_ids: Iterable[str] | None = None) -> Inventory:
+    """
+    Builds the whole-tenant SQL inventory from Resource Graph.
+
+    Servers and databases across every subscription come back from a single
+    paged query, instead of one call per subscription and per server.
+    """
+    selected = list(subscription_ids) if subscription_ids is not None else None
+    inventory = Inventory()
+    servers: dict[str, InventoryServer] = {}
+    databases: list[dict[str, Any]] = []
+    try:
+        subscription_names = {
+            row["subscriptionId"]: row["name"]
+            for row in query(_SUBSCRIPTIONS_QUERY, selected)
+        }
+        for row in query(_SQL_RESOURCES_QUERY, selected):
+            if row["type"].lower() == "microsoft.sql/servers":
+                entry = InventoryServer(
+                    subscription_id=row["subscriptionId"],
+                    subscription_name=subscription_names.get(row["subscriptionId"]),
+                    server=ServerRecord(row["name"], row["id"]),
+                    resource_group_name=row["resourceGroup"],
+                )
+                servers[row["id"].lower()] = entry
+                inventory.servers.append(entry)
+                azure_handler.remember_resource_group(
+                    row["subscriptionId"], row["name"], row["resourceGroup"]
+                )
+            else:
+                databases.append(row)
+    except AzureError as e:
+        # One query covers every subscription, so its failure is reported once.
+        inventory.errors.append(f"Resource Graph: {e.message}")
+    for row in databases:
+        server_id = row["id"].lower().rsplit("/databases/", 1)[0]
+        owner = servers.get(server_id)
+        if owner is not None:
+            owner.databases.append(_database_record(row))
+    inventory.sort()
+    return inventory
@@ -0,0 +1,243 @@
+import contextlib
+import os
+import threading
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+# Seconds between resource samples of a running sqlpackage. Override with
+# BACPACMAN_SAMPLE_INTERVAL; 0 turns sampling off.
+DEFAULT_SAMPLE_INTERVAL = 5.0
+
+# Share of the run sqlpackage spent on a CPU, or waiting for the disk, above
+# which that is taken to be what held it back.
+CPU_BOUND_SHARE = 0.8
+DISK_BOUND_SHARE = 0.3
+
+_PROC = Path("/proc")
+
+# Whether the kernel counts block I/O delays per task. Missing before Linux
+# 5.14, where delay accounting was always on.
+_DELAY_ACCOUNTING = _PROC / "sys" / "kernel" / "task_delayacct"
+
+# Lines of /proc/<pid>/io and the counters they fill in.
+_IO_FIELDS = {
+    "rchar": "read_chars",
+    "wchar": "write_chars",
+    "read_bytes": "read_bytes",
+    "write_bytes": "write_bytes",
+}
+
+
+@dataclass
+class ResourceUsage:
+    """
+    What a sqlpackage run used, summed over its process group.
+
+    ``read_bytes`` and ``write_bytes`` count storage I/O, while ``read_chars``
+    and ``write_chars`` count everything read or written, including the
+    network. ``blkio_seconds`` is time spent waiting for block I/O, which is
+    only counted if the kernel has delay accounting turned on, as recorded in
+    ``blkio_available``.
+    """
+
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    read_chars: int = 0
+    write_chars: int = 0
+    blkio_seconds: float = 0.0
+    samples: int = 0
+    blkio_available: bool = False
+
+    def since(self, earlier: "ResourceUsage") -> "ResourceUsage":
+        """Returns the counters' growth since ``earlier``, keeping this peak."""
+        delta = ResourceUsage(
+            peak_rss_bytes=self.peak_rss_bytes, blkio_available=self.blkio_available
+        )
+        for f in fields(self):
+            if f.name not in ("peak_rss_bytes", "blkio_available"):
+                setattr(delta, f.name, getattr(self, f.name) - getattr(earlier, f.name))
+        return delta
+
+    def bottleneck(self, elapsed: float) -> str | None:
+        """
+        Guesses whether a run was held back by the CPU, the disk or the network.
+
+        Time that is neither spent on a CPU nor waiting for the disk is taken
+        to be waiting for the server. Without delay accounting, disk waits
+        cannot be told apart from network waits, so a run that was not
+        CPU-bound is 'unknown'. Returns None if nothing was sampled.
+        """
+        if not self.samples or elapsed <= 0:
+            return None
+        if self.cpu_seconds / elapsed >= CPU_BOUND_SHARE:
+            return "cpu"
+        if not self.blkio_available:
+            return "unknown"
+        if self.blkio_seconds / elapsed >= DISK_BOUND_SHARE:
+            return "disk"
+        return "network"
+
+
+@dataclass
+class _ProcessCounters:
+    cpu_seconds: float = 0.0
+    rss_bytes: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    read_chars: int = 0
+    write_chars: int = 0
+    blkio_seconds: float = 0.0
+
+
+def get_sample_interval() -> float:
+    """Resolves the sampling interval from BACPACMAN_SAMPLE_INTERVAL."""
+    try:
+        return max(0.0, float(os.getenv("BACPACMAN_SAMPLE_INTERVAL", "")))
+    except ValueError:
+        return DEFAULT_SAMPLE_INTERVAL
+
+
+def is_supported() -> bool:
+    """Whether processes can be sampled here, which needs Linux's /proc."""
+    return (_PROC / "self" / "stat").exists()
+
+
+def delay_accounting_enabled() -> bool:
+    """Whether block I/O waits are counted, which needs kernel.task_delayacct."""
+    try:
+        return _DELAY_ACCOUNTING.read_text().strip() == "1"
+    except FileNotFoundError:
+        return is_supported()
+    except OSError:
+        return False
+
+
+def _group_members(group_id: int) -> list[int]:
+    """Returns the processes in a process group."""
+    members = []
+    for entry in _PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        with contextlib.suppress(OSError, IndexError, ValueError):
+            stat = (entry / "stat").read_text()
+            # The command name is in parentheses and may contain spaces.
+            if int(stat.rsplit(")", 1)[1].split()[2]) == group_id:
+                members.append(int(entry.name))
+    return members
+
+
+def _read_process(pid: int) -> _ProcessCounters | None:
+    """Reads a process's counters from /proc, or None if it has gone."""
+    ticks = os.sysconf("SC_CLK_TCK")
+    try:
+        stat = (_PROC / str(pid) / "stat").read_text().rsplit(")", 1)[1].split()
+        # Fields from the third on: utime is the 14th, stime the 15th, rss (in
+        # pages) the 24th and delayacct_blkio_ticks the 42nd.
+        counters = _ProcessCounters(
+            cpu_seconds=(int(stat[11]) + int(stat[12])) / ticks,
+            rss_bytes=int(stat[21]) * os.sysconf("SC_PAGE_SIZE"),
+            blkio_seconds=int(stat[39]) / ticks if len(stat) > 39 else 0.0,
+        )
+    except (OSError, IndexError, ValueError):
+        return None
+    with contextlib.suppress(OSError, ValueError):
+        # Only readable for our own processes; storage I/O is then unknown.
+        for line in (_PROC / str(pid) / "io").read_text().splitlines():
+            name, _, value = line.partition(":")
+            if name in _IO_FIELDS:
+                setattr(counters, _IO_FIELDS[name], int(value))
+    return counters
+
+
+class ProcessSampler:
+    """
+    Samples the CPU time, memory and I/O of a process group on a thread.
+
+    Counters are kept for every process seen, so work done by a child that
+    has since exited still counts. Does nothing where /proc is unavailable.
+    """
+
+    def __init__(self, group_id: int, interval: float | None = None) -> None:
+        self.group_id = group_id
+        self.interval = get_sample_interval() if interval is None else interval
+        self._lock = threading.Lock()
+        self._last: dict[int, _ProcessCounters] = {}
+        blkio_available = delay_accounting_enabled()
+        self._usage = ResourceUsage(blkio_available=blkio_available)
+        self._mark = ResourceUsage(blkio_available=blkio_available)
+        self._mark_peak = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 and is_supported()
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._run, name=f"sampler-{self.group_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> ResourceUsage:
+        """Stops sampling and returns the usage of the whole run."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            return ResourceUsage(**vars(self._usage))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Reads every process in the group once."""
+        if not self.enabled:
+            return
+        current = {
+            pid: counters
+            for pid in _group_members(self.group_id)
+            if (counters := _read_process(pid)) is not None
+        }
+        with self._lock:
+            self._last.update(current)
+            usage = self._usage
+            for f in fields(_ProcessCounters):
+                if f.name != "rss_bytes":
+                    total = sum(getattr(c, f.name) for c in self._last.values())
+                    setattr(usage, f.name, total)
+            rss = sum(c.rss_bytes for c in current.values())
+            usage.peak_rss_bytes = max(usage.peak_rss_bytes, rss)
+            self._mark_peak = max(self._mark_peak, rss)
+            usage.samples += 1
+
+    def checkpoint(self) -> ResourceUsage:
+        """
+        Samples now and returns the usage since the previous checkpoint.
+
+        Used to split a run's usage between sqlpackage's phases.
+        """
+        self.sample()
+        with self._lock:
+            current = ResourceUsage(**vars(self._usage))
+            delta = current.since(self._mark)
+            delta.peak_rss_bytes = self._mark_peak
+            self._mark = current
+            self._mark_peak = 0
+        return delta
+
+
+@dataclass
+class PhaseTiming:
+    """How long one of sqlpackage's phases took and what it used."""
+
+    name: str
+    started: float  # seconds after the run started
+    seconds: float
+    usage: ResourceUsage = field(default_factory=ResourceUsage)
@@ -0,0 +1,214 @@
+import contextlib
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+
+import click
+from azure.core.exceptions import HttpResponseError
+from azure.core.polling import LROPoller
+from azure.mgmt.sql.models import Database, DatabaseUpdate, Sku
+
+from . import azure_handler, planning
+
+# How often to ask Azure to restore a database's SKU before giving up, and the
+# seconds to wait after the first failure, doubling each time.
+RESTORE_ATTEMPTS = 4
+RESTORE_RETRY_DELAY = 15.0
+
+
+@dataclass
+class ScaleUp:
+    """A database moved to a bigger service objective for the length of an export."""
+
+    subscription_id: str
+    resource_group_name: str
+    server_name: str
+    database_name: str
+    original_sku: Sku
+    service_objective: str
+    size_bytes: float | None = None
+    # Time spent waiting for Azure to scale up and back down.
+    scaling_seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        """Whether the target objective differs from the original one."""
+        original = (self.original_sku.name or "").lower()
+        return original != self.service_objective.lower()
+
+
+def _begin_update(scale: ScaleUp, sku: Sku) -> LROPoller[Database]:
+    databases = azure_handler.get_sql_client(scale.subscription_id).databases
+    return databases.begin_update(
+        scale.resource_group_name,
+        scale.server_name,
+        scale.database_name,
+        DatabaseUpdate(sku=sku),
+    )
+
+
+def _restore(scale: ScaleUp, pending: LROPoller[Database] | None = None) -> None:
+    """
+    Puts a database back on its original SKU.
+
+    A scale-up that is still in progress (``pending``) is waited for first, as
+    Azure rejects a second change while one is running. Failed requests are
+    retried with a growing delay; if they keep failing, a warning names the
+    SKU to restore by hand. Ctrl-C is ignored until the request has been sent;
+    after that, Azure finishes the change even if bacpacman is stopped while
+    waiting for it.
+    """
+    original = scale.original_sku.name
+    if pending is not None and not pending.done():
+        click.echo(
+            f"Waiting for the scale-up of {scale.database_name} to finish...",
+            err=True,
+        )
+        try:
+            pending.wait()
+        except KeyboardInterrupt:
+            click.echo(
+                f"Warning: {scale.database_name} is still being scaled up. "
+                f"Scale it back to {original} once that has finished.",
+                err=True,
+            )
+            raise
+    click.echo(f"Restoring {scale.database_name} to {original}...", err=True)
+    for attempt in range(1, RESTORE_ATTEMPTS + 1):
+        try:
+            while True:
+                try:
+                    poller = _begin_update(scale, scale.original_sku)
+                    break
+                except KeyboardInterrupt:
+                    click.echo(
+                        "Please wait until the restore has been requested.", err=True
+                    )
+            try:
+                poller.result()
+            except KeyboardInterrupt:
+                click.echo(
+                    f"Azure will finish restoring {scale.database_name} to "
+                    f"{original} in the background.",
+                    err=True,
+                )
+                raise
+            return
+        except HttpResponseError as e:
+            if attempt == RESTORE_ATTEMPTS:
+                click.echo(
+                    f"Warning: could not restore {scale.database_name} to "
+                    f"{original}: {e.message}. Scale it back by hand.",
+                    err=True,
+                )
+                return
+            delay = RESTORE_RETRY_DELAY * 2 ** (attempt - 1)
+            click.echo(
+                f"Restoring {scale.database_name} failed: {e.message}. "
+                f"Retrying in {delay:.0f}s...",
+                err=True,
+            )
+            time.sleep(delay)
+
+
+@contextlib.contextmanager
+def scaled_up(
+    server_name: str,
+    database_name: str,
+    service_objective: str,
+    subscription_id: str | None = None,
+) -> Iterator[ScaleUp]:
+    """
+    Scales a database to ``service_objective`` for the duration of the block.
+
+    The current SKU is recorded first and always restored on the way out,
+    including when the block fails or is interrupted with Ctrl-C. Raises
+    ValueError for a database that cannot be scaled on its own, such as one in
+    an elastic pool.
+    """
+    subscription_id = subscription_id or azure_handler.current_subscription_id()
+    resource_group_name = azure_handler.find_resource_group(
+        subscription_id, server_name
+    )
+    if not resource_group_name:
+        raise ValueError(f"Server {server_name} was not found in the subscription.")
+    databases = azure_handler.get_sql_client(subscription_id).databases
+    database = databases.get(resource_group_name, server_name, database_name)
+    if database.elastic_pool_id:
+        raise ValueError(
+            f"{database_name} is in an elastic pool; scale the pool instead."
+        )
+    if database.sku is None:
+        raise ValueError(f"The service objective of {database_name} is unknown.")
+    scale = ScaleUp(
+        subscription_id=subscription_id,
+        resource_group_name=resource_group_name,
+        server_name=server_name,
+        database_name=database_name,
+        original_sku=database.sku,
+        service_objective=service_objective,
+    )
+    with contextlib.suppress(HttpResponseError):
+        scale.size_bytes = azure_handler.get_database_size(
+            subscription_id, resource_group_name, server_name, database_name
+        )
+    if not scale.changed:
+        yield scale
+        return
+
+    click.echo(
+        f"Scaling {database_name} from {database.sku.name} to {service_objective}..."
+    )
+    started = time.monotonic()
+    pending = None
+    try:
+        pending = _begin_update(scale, Sku(name=service_objective))
+        pending.result()
+        scale.scaling_seconds = time.monotonic() - started
+        yield scale
+    finally:
+        started = time.monotonic()
+        _restore(scale, pending)
+        scale.scaling_seconds += time.monotonic() - started
+
+
+def time_saved(scale: ScaleUp, elapsed: float) -> str | None:
+    """
+    Compares an export's duration with the estimate at the original tier.
+
+    Scaling time counts against the saving. Returns None if the database size
+    is unknown.
+    """
+    if scale.size_bytes is None or not scale.changed:
+        return None
+    estimate = scale.size_bytes / planning.export_throughput(scale.original_sku.tier)
+    total = elapsed + scale.scaling_seconds
+    message = (
+        f"Export took {planning.format_duration(elapsed)} plus "
+        f"{planning.format_duration(scale.scaling_seconds)} scaling; about "
+        f"{planning.format_duration(estimate)} was expected at "
+        f"{scale.original_sku.name}."
+    )
+    if total < estimate:
+        return f"{message} Saved about {planning.format_duration(estimate - total)}."
+    return f"{message} Scaling up did not save time."
+
+
+def run_scaled_up(
+    server_name: str,
+    database_name: str,
+    service_objective: str,
+    export: Callable[[], bool],
+) -> bool:
+    """
+    Runs ``export`` with the database scaled up, then reports the time saved
+    if it succeeded.
+    """
+    with scaled_up(server_name, database_name, service_objective) as scale:
+        started = time.monotonic()
+        succeeded = export()
+        elapsed = time.monotonic() - started
+    message = time_saved(scale, elapsed) if succeeded else None
+    if message:
+        click.echo(message)
+    return succeeded
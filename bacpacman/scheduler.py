@@ -0,0 +1,410 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from azure.identity import CredentialUnavailableError
+
+from . import copies, sql_handler, sqlpackage
+
+# Where a batch records its finished jobs, in its output or work directory.
+STATE_FILE_NAME = ".bacpacman-state.json"
+
+# Seconds between checks for Ctrl-C while waiting for jobs to finish.
+JOIN_INTERVAL = 0.5
+
+# Default concurrency limits for multi-database jobs. Databases in the same
+# elastic pool share its resources, so by default only one runs at a time.
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_PER_SERVER = 2
+DEFAULT_PER_POOL = 1
+
+
+class JobFailed(Exception):
+    """Raised by a job's action to report why it failed."""
+
+
+@dataclass
+class Limits:
+    """
+    How many jobs may run at once, overall and per server and pool.
+
+    ``per_kind`` caps each kind of job separately, e.g. {"export": 3,
+    "import": 1}, so network-bound exports and disk-bound imports each get
+    their own share of the workers.
+    """
+
+    max_parallel: int = DEFAULT_MAX_PARALLEL
+    per_server: int = DEFAULT_PER_SERVER
+    per_pool: int = DEFAULT_PER_POOL
+    per_kind: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class Job:
+    """
+    One unit of work, such as exporting or importing a database.
+
+    ``action`` does the work and raises on failure. The job does not start
+    until every job named in ``depends_on`` has succeeded, and is skipped if
+    any of them fails.
+    """
+
+    name: str
+    action: Callable[[], None]
+    server_name: str | None = None
+    elastic_pool: str | None = None
+    depends_on: list[str] = field(default_factory=list)
+    kind: str = "job"
+    # A file the job produces; a resumed run only trusts a recorded success
+    # if the file is still there.
+    output: str | None = None
+
+    @property
+    def server_key(self) -> str | None:
+        return self.server_name.lower() if self.server_name else None
+
+    @property
+    def pool_key(self) -> tuple[str, str] | None:
+        if not self.server_name or not self.elastic_pool:
+            return None
+        return self.server_name.lower(), self.elastic_pool.lower()
+
+
+@dataclass
+class JobResult:
+    """The outcome of one job."""
+
+    job: Job
+    status: str  # "succeeded", "failed" or "skipped"
+    elapsed: float = 0.0
+    error: str | None = None
+    # Whether the job had already succeeded in an earlier, interrupted run.
+    resumed: bool = False
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "succeeded"
+
+
+class RunState:
+    """
+    Records which jobs of a batch have succeeded, in a JSON file.
+
+    When a batch is run again after a failure or interruption, jobs recorded
+    here are not run again. The file is rewritten atomically after every job.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._completed: dict[str, dict[str, Any]] = {}
+        with contextlib.suppress(OSError, ValueError):
+            with open(path, encoding="utf-8") as f:
+                completed = json.load(f).get("completed", {})
+            if isinstance(completed, dict):
+                self._completed = completed
+
+    def is_done(self, job: Job) -> bool:
+        """Whether the job succeeded before and its output is still there."""
+        with self._lock:
+            done = job.name in self._completed
+        return done and (job.output is None or os.path.exists(job.output))
+
+    @property
+    def completed(self) -> list[str]:
+        with self._lock:
+            return list(self._completed)
+
+    def mark_done(self, result: JobResult) -> None:
+        with self._lock:
+            self._completed[result.job.name] = {
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "elapsed_seconds": round(result.elapsed, 3),
+                "output": result.job.output,
+            }
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"completed": self._completed}, f, indent=2)
+            os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        """Forgets every job, deleting the file."""
+        with self._lock:
+            self._completed.clear()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+
+
+def run_command(command: list[str], env: dict[str, str] | None = None) -> None:
+    """Runs a sqlpackage export quietly, raising JobFailed if it fails."""
+    try:
+        result = sql_handler.run_sqlpackage(command, env=env)
+    except FileNotFoundError as e:
+        raise JobFailed("'sqlpackage' command not found") from e
+    except (CredentialUnavailableError, ClientAuthenticationError) as e:
+        raise JobFailed(f"could not get an access token: {e}") from e
+    if not result.succeeded:
+        lines = result.stderr.strip().splitlines()
+        raise JobFailed(lines[-1] if lines else f"exited with {result.returncode}")
+
+
+def export_database(
+    server_name: str,
+    database_name: str,
+    output_file: str,
+    auth_method: str,
+    username: str | None = None,
+    profile: str | None = None,
+    size_bytes: float | None = None,
+    include_tables: list[str] | None = None,
+    exclude_tables: list[str] | None = None,
+    source: str = "primary",
+    via_copy: bool = False,
+    copy_service_objective: str | None = None,
+) -> None:
+    """
+    Exports a database with extract_bacpac, raising JobFailed if it fails.
+
+    With ``via_copy``, the export reads from a temporary copy of the database,
+    created with ``copy_service_objective`` if given and dropped afterwards.
+    """
+
+    def export(name: str) -> bool:
+        return sql_handler.extract_bacpac(
+            server_name,
+            name,
+            output_file,
+            auth_method,
+            username,
+            show_progress=False,
+            profile=profile,
+            size_bytes=size_bytes,
+            include_tables=include_tables,
+            exclude_tables=exclude_tables,
+            source=source,
+        )
+
+    if via_copy:
+        try:
+            copy = copies.begin_copy(server_name, database_name, copy_service_objective)
+            succeeded = copies.export_from_copy(copy, lambda: export(copy.copy_name))
+        except (ValueError, HttpResponseError) as e:
+            raise JobFailed(f"copy of {database_name} failed: {e}") from e
+    else:
+        succeeded = export(database_name)
+    if not succeeded:
+        raise JobFailed(f"export of {database_name} from {server_name} failed")
+
+
+def import_database(
+    input_file: str,
+    server_name: str,
+    database_name: str,
+    auth_method: str | None = None,
+    username: str | None = None,
+    profile: str | None = None,
+) -> None:
+    """Imports a bacpac with import_bacpac, raising JobFailed if it fails."""
+    if not sql_handler.import_bacpac(
+        input_file,
+        server_name,
+        database_name,
+        auth_method,
+        username,
+        show_progress=False,
+        profile=profile,
+    ):
+        raise JobFailed(f"import of {input_file} to {database_name} failed")
+
+
+def check_dependencies(jobs: list[Job]) -> None:
+    """Raises ValueError for duplicate names, unknown dependencies or cycles."""
+    by_name: dict[str, Job] = {}
+    for job in jobs:
+        if job.name in by_name:
+            raise ValueError(f"Duplicate job name: {job.name}")
+        by_name[job.name] = job
+    for job in jobs:
+        for dependency in job.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Job {job.name} depends on unknown job {dependency}")
+
+    done: set[str] = set()
+
+    def visit(job: Job, path: list[str]) -> None:
+        if job.name in path:
+            cycle = " -> ".join(path[path.index(job.name) :] + [job.name])
+            raise ValueError(f"Dependency cycle: {cycle}")
+        if job.name in done:
+            return
+        for dependency in job.depends_on:
+            visit(by_name[dependency], path + [job.name])
+        done.add(job.name)
+
+    for job in jobs:
+        visit(job, [])
+
+
+def run_jobs(
+    jobs: list[Job],
+    limits: Limits | None = None,
+    on_start: Callable[[Job], None] | None = None,
+    on_finish: Callable[[JobResult], None] | None = None,
+    state: RunState | None = None,
+) -> list[JobResult]:
+    """
+    Runs jobs concurrently within the given limits and their dependencies.
+
+    Jobs start in order, except that a job that is waiting on a dependency, or
+    whose server or elastic pool is at its limit, is passed over for the next
+    one that can run, so one busy server does not hold up the rest. Jobs whose
+    dependencies failed are skipped. ``on_start`` and ``on_finish`` are called
+    from worker threads, one at a time. Results are in the order of ``jobs``.
+
+    With a ``state``, jobs it records as done are reported as resumed without
+    running, and every job that succeeds is added to it.
+    """
+    check_dependencies(jobs)
+    limits = limits or Limits()
+    per_server = max(1, limits.per_server)
+    per_pool = max(1, limits.per_pool)
+    pending = list(jobs)
+    running_by_server: Counter[str] = Counter()
+    running_by_pool: Counter[tuple[str, str]] = Counter()
+    running_by_kind: Counter[str] = Counter()
+    results: dict[str, JobResult] = {}
+    changed = threading.Condition()
+    cancelled = threading.Event()
+    reporting = threading.Lock()
+
+    def report(result: JobResult) -> None:
+        if on_finish is not None:
+            with reporting:
+                on_finish(result)
+
+    def at_limit(job: Job) -> bool:
+        kind_limit = limits.per_kind.get(job.kind)
+        if kind_limit is not None and running_by_kind[job.kind] >= max(1, kind_limit):
+            return True
+        if job.server_key and running_by_server[job.server_key] >= per_server:
+            return True
+        pool = job.pool_key
+        return pool is not None and running_by_pool[pool] >= per_pool
+
+    def next_job() -> Job | None:
+        with changed:
+            while pending and not cancelled.is_set():
+                skipped_any = False
+                for job in list(pending):
+                    dependencies = [results.get(name) for name in job.depends_on]
+                    failed = [r for r in dependencies if r and not r.succeeded]
+                    if failed:
+                        pending.remove(job)
+                        skipped = JobResult(
+                            job,
+                            "skipped",
+                            error=f"{failed[0].job.name} did not succeed",
+                        )
+                        results[job.name] = skipped
+                        report(skipped)
+                        changed.notify_all()
+                        skipped_any = True
+                    elif all(dependencies) and not at_limit(job):
+                        pending.remove(job)
+                        running_by_kind[job.kind] += 1
+                        if job.server_key:
+                            running_by_server[job.server_key] += 1
+                        if job.pool_key:
+                            running_by_pool[job.pool_key] += 1
+                        return job
+                if skipped_any:
+                    # Jobs passed over earlier may depend on the skipped one.
+                    continue
+                if pending and any(running_by_kind.values()):
+                    # Everything left is waiting on a running job.
+                    changed.wait()
+            return None
+
+    def finish(result: JobResult) -> None:
+        job = result.job
+        with changed:
+            running_by_kind[job.kind] -= 1
+            if job.server_key:
+                running_by_server[job.server_key] -= 1
+            if job.pool_key:
+                running_by_pool[job.pool_key] -= 1
+            results[job.name] = result
+            changed.notify_all()
+
+    if state is not None:
+        done = {job.name for job in jobs if state.is_done(job)}
+        recorded = set(state.completed)
+        # A job whose output has been used up, like a bacpac removed after its
+        # import, is still done once every job that needed it is done.
+        while True:
+            consumed = {
+                job.name
+                for job in jobs
+                if job.name in recorded
+                and job.name not in done
+                and (dependents := [j for j in jobs if job.name in j.depends_on])
+                and all(d.name in done for d in dependents)
+            }
+            if not consumed:
+                break
+            done |= consumed
+        for job in jobs:
+            if job.name in done:
+                pending.remove(job)
+                results[job.name] = JobResult(job, "succeeded", resumed=True)
+                report(results[job.name])
+
+    def worker() -> None:
+        while (job := next_job()) is not None:
+            if on_start is not None:
+                with reporting:
+                    on_start(job)
+            started = time.monotonic()
+            try:
+                job.action()
+                result = JobResult(job, "succeeded", time.monotonic() - started)
+            except Exception as e:
+                result = JobResult(job, "failed", time.monotonic() - started, str(e))
+            if result.succeeded and state is not None:
+                try:
+                    state.mark_done(result)
+                except OSError as e:
+                    result.error = f"could not record success: {e}"
+            finish(result)
+            report(result)
+
+    workers = [
+        threading.Thread(target=worker, name=f"job-{i}", daemon=True)
+        for i in range(max(1, min(limits.max_parallel, len(pending))))
+    ]
+    sqlpackage.reset_cancel()
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            # Join in steps so Ctrl-C reaches this thread on every platform.
+            while thread.is_alive():
+                thread.join(JOIN_INTERVAL)
+    except KeyboardInterrupt:
+        # Workers never see Ctrl-C: stop handing out jobs, stop sqlpackage, and
+        # give the running jobs a chance to clean up before giving up on them.
+        with changed:
+            cancelled.set()
+            changed.notify_all()
+        sqlpackage.cancel_all()
+        for thread in workers:
+            thread.join()
+        raise
+    return [results[job.name] for job in jobs]
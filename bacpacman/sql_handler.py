@@ -1,84 +1,493 @@
+import contextlib
+import os
 import platform
 import shutil
-import subprocess
 import sys
+import tempfile
+import threading
+from collections import Counter
+from collections.abc import Callable
 
 import click
 import keyring
 import keyring.errors
 import questionary
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from azure.identity import CredentialUnavailableError
 
+from . import azure_handler, planning, profiles, sqlpackage, tables
+from .planning import (
+    BACPAC_COMPRESSION_RATIO,
+    ExportPlan,
+    format_duration,
+    format_size,
+)
+from .progress import ProgressDisplay
 
-def extract_bacpac(
+# Where an export reads from: the primary, a read-only replica of it reached
+# with ApplicationIntent=ReadOnly, or a geo-secondary found via replication links.
+EXPORT_SOURCES = ("primary", "read-only", "geo-secondary")
+
+ACCESS_TOKEN_ARGUMENT = "/AccessToken:"
+_TARGET_FILE = "/TargetFile:"
+_TEMP_DIRECTORY = "/p:TempDirectoryForTableData="
+
+# Hidden directory beside the output where unfinished bacpacs are written.
+PARTIAL_DIR_NAME = ".bacpacman-partial"
+
+# Exports running in each partial directory, so the last one removes it.
+_partial_dir_users: Counter[str] = Counter()
+_partial_dir_lock = threading.Lock()
+
+# How describe_usage() words each bottleneck.
+_BOTTLENECKS = {
+    "cpu": "busy on the CPU",
+    "disk": "waiting for the disk",
+    "network": "waiting for the server or the network",
+    # Without delay accounting, disk waits look the same as network waits.
+    "unknown": "waiting for the disk or the network",
+}
+
+
+def get_password(server_name: str, username: str) -> str | None:
+    """
+    Returns the SQL login's password from the keyring, asking for it if needed.
+
+    A password that is asked for is stored in the keyring for next time.
+    Raises keyring.errors.NoKeyringError if no keyring backend is available.
+    """
+    password = keyring.get_password(server_name, username)
+    if not password:
+        password = questionary.password(
+            f"Enter password for {username} on {server_name}:"
+        ).ask()
+        if password:
+            keyring.set_password(server_name, username, password)
+    return password
+
+
+def _print_no_keyring() -> None:
+    questionary.print(
+        "Error: No keyring backend found. Please install a backend for your OS "
+        "(e.g., 'secretstorage' on Linux).",
+        style="bold fg:red",
+    )
+
+
+def _report_preflight(preflight: planning.Preflight, check_space: bool) -> bool:
+    """Prints any disk space problems; returns False if the run should stop."""
+    for problem in preflight.problems:
+        questionary.print(f"Warning: {problem}", style="bold fg:yellow")
+    if preflight.ok or not check_space:
+        return True
+    questionary.print(
+        "Not starting sqlpackage because there is not enough disk space.",
+        style="bold fg:red",
+    )
+    return False
+
+
+def _profile_message(
+    selected: profiles.Profile, requested: str | None, size_bytes: float | None
+) -> str:
+    """Says which profile is used and, for 'auto', what it was picked from."""
+    message = f"Using the '{selected.name}' sqlpackage profile"
+    if requested not in (None, profiles.AUTO):
+        return f"{message}."
+    if size_bytes is None:
+        return f"{message}; the size is unknown, so sqlpackage's defaults apply."
+    return f"{message} for {planning.format_size(size_bytes)}."
+
+
+def find_source(
+    server_name: str, database_name: str, source: str = "primary"
+) -> tuple[str, str]:
+    """
+    Returns the server and database an export should read from.
+
+    For 'geo-secondary' this is the database's readable secondary, looked up
+    in the subscription in AZURE_SUBSCRIPTION_ID. Raises ValueError if there
+    is none.
+    """
+    if source != "geo-secondary":
+        return server_name, database_name
+    secondary = azure_handler.find_geo_secondary(
+        azure_handler.current_subscription_id(), server_name, database_name
+    )
+    if secondary is None:
+        raise ValueError(f"{database_name} on {server_name} has no readable secondary.")
+    return secondary
+
+
+def _access_token() -> str | None:
+    """Returns an Azure SQL access token, or None to let sqlpackage sign in."""
+    try:
+        return azure_handler.get_sql_access_token()
+    except (CredentialUnavailableError, ClientAuthenticationError) as e:
+        questionary.print(
+            f"Could not get an access token ({e}); sqlpackage will sign in "
+            "interactively.",
+            style="fg:yellow",
+        )
+        return None
+
+
+def refresh_access_token(command: list[str]) -> list[str]:
+    """
+    Returns the command with a current token in its /AccessToken argument.
+
+    Commands built ahead of a batch can wait a long time before they start, so
+    they are given the shared credential's latest token just before they run.
+    """
+    if not any(arg.startswith(ACCESS_TOKEN_ARGUMENT) for arg in command):
+        return command
+    token = azure_handler.get_sql_access_token()
+    return [
+        (
+            f"{ACCESS_TOKEN_ARGUMENT}{token}"
+            if arg.startswith(ACCESS_TOKEN_ARGUMENT)
+            else arg
+        )
+        for arg in command
+    ]
+
+
+def partial_path(output_file: str) -> str:
+    """
+    Returns where an export writes its bacpac until it succeeds.
+
+    The file sits in a hidden directory beside the output, on the same volume
+    so it can be renamed into place atomically, and out of reach of the
+    import workflow's search for *.bacpac files.
+    """
+    directory, name = os.path.split(os.path.abspath(output_file))
+    return os.path.join(directory, PARTIAL_DIR_NAME, name)
+
+
+def describe_usage(result: sqlpackage.RunResult) -> str | None:
+    """Summarizes what a run used and what held it back, if it was sampled."""
+    usage = result.usage
+    if usage is None or result.elapsed <= 0:
+        return None
+    slowest = max(result.phases, key=lambda phase: phase.seconds, default=None)
+    summary = (
+        f"sqlpackage used {usage.cpu_seconds / result.elapsed:.0%} of a CPU and "
+        f"up to {format_size(usage.peak_rss_bytes)} of memory, read "
+        f"{format_size(usage.read_chars)} and wrote "
+        f"{format_size(usage.write_chars)} ({format_size(usage.write_bytes)} "
+        f"to disk); it was mostly {_BOTTLENECKS[result.bottleneck or 'unknown']}."
+    )
+    if slowest is not None:
+        duration = format_duration(slowest.seconds)
+        summary += f" Longest phase: {slowest.name} ({duration})."
+    return summary
+
+
+def run_sqlpackage(
+    command: list[str],
+    on_event: Callable[[sqlpackage.ProgressEvent], None] | None = None,
+    env: dict[str, str] | None = None,
+    policy: sqlpackage.RetryPolicy | None = None,
+) -> sqlpackage.RunResult:
+    """
+    Runs a sqlpackage command, retrying it after transient errors as
+    ``policy`` allows (by default, the policy from the environment).
+
+    An export's bacpac is written to partial_path() and renamed to the target
+    file only once the export succeeds, so a failed or interrupted export never
+    leaves a file that looks complete, or replaces a good one. The partial
+    directory is removed once no export is using it. sqlpackage gets
+    a private temp directory inside the one it was given, which is created if
+    missing, removed afterwards with anything it left behind. Every attempt
+    gets a current access token.
+    """
+    target_file = next(
+        (arg.split(":", 1)[1] for arg in command if arg.startswith(_TARGET_FILE)),
+        None,
+    )
+    partial_file = partial_path(target_file) if target_file else None
+    partial_dir = os.path.dirname(partial_file) if partial_file else None
+    if partial_dir:
+        with _partial_dir_lock:
+            _partial_dir_users[partial_dir] += 1
+    base_temp_dir = next(
+        (arg.split("=", 1)[1] for arg in command if arg.startswith(_TEMP_DIRECTORY)),
+        (env or {}).get("TMPDIR"),
+    )
+    if base_temp_dir:
+        # Otherwise mkdtemp's FileNotFoundError reads as sqlpackage missing.
+        os.makedirs(base_temp_dir, exist_ok=True)
+    scratch_dir = tempfile.mkdtemp(prefix="bacpacman-", dir=base_temp_dir)
+    run_env = {
+        **(env or os.environ),
+        "TMP": scratch_dir,
+        "TEMP": scratch_dir,
+        "TMPDIR": scratch_dir,
+    }
+
+    def build_command() -> list[str]:
+        if partial_file:
+            os.makedirs(os.path.dirname(partial_file), exist_ok=True)
+        built = []
+        for arg in refresh_access_token(command):
+            if arg.startswith(_TARGET_FILE) and partial_file:
+                arg = f"{_TARGET_FILE}{partial_file}"
+            elif arg.startswith(_TEMP_DIRECTORY):
+                arg = f"{_TEMP_DIRECTORY}{scratch_dir}"
+            built.append(arg)
+        return built
+
+    def on_retry(retry: int, delay: float, result: sqlpackage.RunResult) -> None:
+        lines = result.stderr.strip().splitlines()
+        questionary.print(
+            f"sqlpackage failed with a transient error"
+            f"{': ' + lines[-1].rstrip('.') if lines else ''}. "
+            f"Retry {retry} in {format_duration(delay)}.",
+            style="fg:yellow",
+        )
+        if partial_file:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial_file)
+
+    try:
+        result = sqlpackage.run_with_retries(
+            build_command, on_event, run_env, policy, on_retry
+        )
+        if result.succeeded and target_file and partial_file:
+            os.replace(partial_file, target_file)
+        return result
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        if partial_file:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial_file)
+        if partial_dir:
+            with _partial_dir_lock:
+                _partial_dir_users[partial_dir] -= 1
+                if not _partial_dir_users[partial_dir]:
+                    del _partial_dir_users[partial_dir]
+                    # Fails harmlessly if another process is still using it.
+                    with contextlib.suppress(OSError):
+                        os.rmdir(partial_dir)
+
+
+def _quote(value: str) -> str:
+    """Quotes a connection string value if it contains separators or quotes."""
+    if not any(c in value for c in ";\"'") and value == value.strip():
+        return value
+    return '"' + value.replace('"', '""') + '"'
+
+
+def export_command(
     server_name: str,
     database_name: str,
     output_file: str,
     auth_method: str,
     username: str | None = None,
-) -> None:
-    """The core logic for extracting a bacpac file."""
-    questionary.print(
-        f"Extracting bacpac from {database_name} on {server_name}...",
-        style="bold fg:green",
-    )
-
-    command: list[str] = [
-        "sqlpackage",
-        "/Action:Export",
-        f"/SourceServerName:tcp:{server_name}.database.windows.net",
-        f"/SourceDatabaseName:{database_name}",
-        "/p:VerifyExtraction=False",
-    ]
+    profile: profiles.Profile | None = None,
+    temp_dir: str | None = None,
+    table_names: list[str] | None = None,
+    read_only: bool = False,
+) -> list[str] | None:
+    """
+    Builds the sqlpackage command that exports a database to a bacpac.
 
-    if auth_method == "aad":
-        command.append("/ua:True")
-    elif auth_method == "sql" and username:
+    With SQL authentication the password comes from the keyring, or is asked
+    for and stored there. Returns None if no keyring backend is available.
+    With Entra ID authentication, sqlpackage is given an access token from the
+    shared Azure credential rather than signing in interactively itself.
+    With ``read_only``, sqlpackage connects with ApplicationIntent=ReadOnly so
+    that the reads are served by a readable replica rather than the primary.
+    """
+    password = None
+    if auth_method == "sql" and username:
         try:
-            password = keyring.get_password(server_name, username)
-            if not password:
-                password = questionary.password(
-                    f"Enter password for {username} on {server_name}:"
-                ).ask()
-                if password:
-                    keyring.set_password(server_name, username, password)
-            if password:
-                command.extend(
-                    [f"/SourceUser:{username}", f"/SourcePassword:{password}"]
-                )
+            password = get_password(server_name, username)
         except keyring.errors.NoKeyringError:
-            questionary.print(
-                "Error: No keyring backend found. Please install a backend for your OS "
-                "(e.g., 'secretstorage' on Linux).",
-                style="bold fg:red",
+            _print_no_keyring()
+            return None
+    token = _access_token() if auth_method == "aad" else None
+
+    command: list[str] = ["sqlpackage", "/Action:Export"]
+    if read_only:
+        # sqlpackage has no ApplicationIntent switch, and a connection string
+        # replaces every other source argument, so it carries the login too.
+        connection_string = (
+            f"Server=tcp:{server_name}.database.windows.net,1433;"
+            f"Database={database_name};Encrypt=True;ApplicationIntent=ReadOnly;"
+        )
+        if auth_method == "aad" and not token:
+            connection_string += "Authentication=Active Directory Interactive;"
+        elif username and password:
+            connection_string += (
+                f"User ID={_quote(username)};Password={_quote(password)};"
             )
-            return
+        command.append(f"/SourceConnectionString:{connection_string}")
+    else:
+        command.extend(
+            [
+                f"/SourceServerName:tcp:{server_name}.database.windows.net",
+                f"/SourceDatabaseName:{database_name}",
+            ]
+        )
+        if auth_method == "aad" and not token:
+            command.append("/ua:True")
+        elif username and password:
+            command.extend([f"/SourceUser:{username}", f"/SourcePassword:{password}"])
+    if token:
+        command.append(f"{ACCESS_TOKEN_ARGUMENT}{token}")
+    command.append("/p:VerifyExtraction=False")
 
+    if profile is not None:
+        command.extend(profiles.export_arguments(profile, temp_dir))
+    if table_names:
+        command.extend(tables.table_data_arguments(table_names))
     command.append(f"/TargetFile:{output_file}")
+    return command
+
 
+def extract_bacpac(
+    server_name: str,
+    database_name: str,
+    output_file: str,
+    auth_method: str,
+    username: str | None = None,
+    plan: ExportPlan | None = None,
+    show_progress: bool = True,
+    profile: str | None = None,
+    size_bytes: float | None = None,
+    check_space: bool = True,
+    include_tables: list[str] | None = None,
+    exclude_tables: list[str] | None = None,
+    source: str = "primary",
+) -> bool:
+    """
+    The core logic for extracting a bacpac file.
+
+    Progress is shown as sqlpackage reports it, unless ``show_progress`` is
+    False, as when several exports run at once. With a plan, the display also
+    estimates the time remaining. ``profile`` names a sqlpackage profile; by
+    default one is picked from the database size, taken from ``size_bytes``,
+    the plan or the selected tables, or else looked up in Azure. When the size
+    is known, the export is refused
+    if the output or temp volume looks too small, unless ``check_space`` is
+    False. ``source`` is one of EXPORT_SOURCES and chooses the replica that
+    serves the export's reads. Returns whether the extraction succeeded.
+    """
     try:
-        questionary.print("Extracting bacpac...", style="bold fg:green")
-        process = subprocess.run(
-            command, check=True, capture_output=True, text=True, encoding="utf-8"
-        )
+        source_server, source_database = find_source(server_name, database_name, source)
+    except (ValueError, HttpResponseError) as e:
+        questionary.print(f"Error: {e}", style="bold fg:red")
+        return False
+    read_only = source != "primary"
+    questionary.print(
+        f"Extracting bacpac from {source_database} on {source_server}"
+        f"{' (read-only)' if read_only else ''}...",
+        style="bold fg:green",
+    )
+    if size_bytes is None and plan is not None:
+        size_bytes = plan.database_bytes
+    table_names = list(include_tables or [])
+    if tables.needs_listing(table_names, exclude_tables or []):
+        try:
+            password = None
+            if auth_method == "sql" and username:
+                password = get_password(source_server, username)
+            listed = tables.list_tables(
+                source_server, source_database, username, password, read_only
+            )
+            selected_tables = tables.select_tables(
+                listed, table_names, exclude_tables or []
+            )
+        except (tables.TablesUnavailableError, ValueError) as e:
+            questionary.print(f"Error: {e}", style="bold fg:red")
+            return False
+        except keyring.errors.NoKeyringError:
+            _print_no_keyring()
+            return False
+        table_names = [table.qualified_name for table in selected_tables]
+        size_bytes = sum(table.size_bytes for table in selected_tables)
         questionary.print(
-            f"Successfully extracted bacpac to {output_file}", style="bold fg:green"
+            f"Exporting data from {len(selected_tables)} of {len(listed)} tables "
+            f"({planning.format_size(size_bytes)})."
         )
-        if process.stdout:
-            questionary.print(process.stdout)
+    if size_bytes is None:
+        size_bytes = azure_handler.lookup_database_size(source_server, source_database)
+    selected_profile = profiles.resolve(profile, size_bytes)
+    questionary.print(_profile_message(selected_profile, profile, size_bytes))
+    temp_dir = profiles.default_temp_dir(selected_profile)
+    if size_bytes is not None:
+        preflight = planning.preflight_export(size_bytes, output_file, selected_profile)
+        temp_dir = preflight.temp_directory
+        if not _report_preflight(preflight, check_space):
+            return False
+    if temp_dir:
+        questionary.print(f"Table data will be buffered in {temp_dir}.")
+    command = export_command(
+        source_server,
+        source_database,
+        output_file,
+        auth_method,
+        username,
+        selected_profile,
+        temp_dir,
+        table_names,
+        read_only,
+    )
+    if command is None:
+        return False
+
+    questionary.print("Extracting bacpac...", style="bold fg:green")
+    display = None
+    if show_progress:
+        display = ProgressDisplay(
+            partial_path(output_file),
+            plan.estimated_bacpac_bytes if plan else None,
+            final_file=output_file,
+        )
+    try:
+        result = run_sqlpackage(command, display, profiles.environment(temp_dir))
     except FileNotFoundError:
         questionary.print("Error: 'sqlpackage' command not found.", style="bold fg:red")
         questionary.print(
             "Please ensure the sqlpackage utility is installed and in your system's "
             "PATH."
         )
-    except subprocess.CalledProcessError as e:
+        return False
+    except (CredentialUnavailableError, ClientAuthenticationError) as e:
+        # The token is renewed before each attempt, including retries.
+        questionary.print(
+            f"Error: Could not get an access token: {e}", style="bold fg:red"
+        )
+        return False
+    finally:
+        if display is not None:
+            display.close()
+
+    if not result.succeeded:
         questionary.print(
             "Error: The 'sqlpackage' command failed.", style="bold fg:red"
         )
-        questionary.print(f"Command executed: {' '.join(command)}")
+        questionary.print(f"Command executed: {sqlpackage.redact(command)}")
         questionary.print("\n--- sqlpackage error output ---", style="bold fg:yellow")
-        questionary.print(e.stderr, style="fg:yellow")
+        if result.stderr_truncated:
+            questionary.print("(earlier output omitted)", style="fg:yellow")
+        questionary.print(result.stderr, style="fg:yellow")
         questionary.print("-------------------------------", style="bold fg:yellow")
+        if result.log_file:
+            questionary.print(
+                f"Full output: {result.log_file} (lines tagged [{result.pid}])"
+            )
+        return False
+    questionary.print(
+        f"Successfully extracted bacpac to {output_file} "
+        f"in {format_duration(result.elapsed)}",
+        style="bold fg:green",
+    )
+    usage = describe_usage(result)
+    if usage:
+        questionary.print(usage)
+    return True
 
 
 def import_bacpac(
@@ -87,9 +496,33 @@ def import_bacpac(
     database_name: str,
     auth_method: str | None = None,
     username: str | None = None,
-) -> None:
-    """Imports a bacpac to a local SQL server."""
+    show_progress: bool = True,
+    profile: str | None = None,
+    check_space: bool = True,
+) -> bool:
+    """
+    Imports a bacpac to a local SQL server. Returns whether it succeeded.
+
+    ``profile`` names a sqlpackage profile; by default one is picked from the
+    database size, estimated from the size of the bacpac. The import is refused
+    if the temp volume looks too small for the bacpac's contents, unless
+    ``check_space`` is False.
+    """
     click.echo(f"Importing {input_file} to {database_name} on {server_name}...")
+    try:
+        size_bytes: float | None = (
+            os.path.getsize(input_file) / BACPAC_COMPRESSION_RATIO
+        )
+    except OSError:
+        size_bytes = None
+    selected_profile = profiles.resolve(profile, size_bytes)
+    click.echo(_profile_message(selected_profile, profile, size_bytes))
+    preflight = planning.preflight_import(input_file, selected_profile)
+    if not _report_preflight(preflight, check_space):
+        return False
+    temp_dir = preflight.temp_directory
+    if temp_dir:
+        click.echo(f"Table data will be buffered in {temp_dir}.")
     command: list[str] = [
         "sqlpackage",
         "/Action:Import",
@@ -97,40 +530,62 @@ def import_bacpac(
         f"/TargetServerName:{server_name}",
         f"/TargetDatabaseName:{database_name}",
         "/TargetTrustServerCertificate:True",  # Trust self-signed certs on localhost
+        *profiles.import_arguments(selected_profile),
     ]
 
     if auth_method == "sql" and username:
         try:
-            password = keyring.get_password(server_name, username)
-            if not password:
-                password = questionary.password(
-                    f"Enter password for {username} on {server_name}:"
-                ).ask()
-                if password:
-                    keyring.set_password(server_name, username, password)
-            if password:
-                command.extend(
-                    [f"/TargetUser:{username}", f"/TargetPassword:{password}"]
-                )
+            password = get_password(server_name, username)
         except keyring.errors.NoKeyringError:
-            questionary.print(
-                "Error: No keyring backend found. Please install a backend for your OS "
-                "(e.g., 'secretstorage' on Linux).",
-                style="bold fg:red",
-            )
-            return
+            _print_no_keyring()
+            return False
+        if password:
+            command.extend([f"/TargetUser:{username}", f"/TargetPassword:{password}"])
 
+    display = ProgressDisplay() if show_progress else None
     try:
-        subprocess.run(command, check=True, capture_output=True, text=True)
-        click.echo(f"Successfully imported {input_file} to {database_name}")
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        # An import that failed part-way leaves a non-empty database behind,
+        # which a retry cannot import into.
+        result = run_sqlpackage(
+            command,
+            display,
+            profiles.environment(temp_dir),
+            sqlpackage.RetryPolicy(retries=0),
+        )
+    except FileNotFoundError as e:
         click.echo(f"Error importing bacpac: {e}")
-        if isinstance(e, subprocess.CalledProcessError):
-            click.echo("\n--- sqlpackage error output ---", err=True)
-            click.echo(e.stderr, err=True)
-            click.echo("-------------------------------", err=True)
-        else:
-            click.echo("Please ensure 'sqlpackage' is installed and in your PATH.")
+        click.echo("Please ensure 'sqlpackage' is installed and in your PATH.")
+        return False
+    except (CredentialUnavailableError, ClientAuthenticationError) as e:
+        click.echo(f"Error importing bacpac: could not get an access token: {e}")
+        return False
+    finally:
+        if display is not None:
+            display.close()
+
+    if not result.succeeded:
+        click.echo(
+            f"Error importing bacpac: sqlpackage exited with code {result.returncode}"
+        )
+        click.echo("\n--- sqlpackage error output ---", err=True)
+        if result.stderr_truncated:
+            click.echo("(earlier output omitted)", err=True)
+        click.echo(result.stderr, err=True)
+        click.echo("-------------------------------", err=True)
+        if result.log_file:
+            click.echo(
+                f"Full output: {result.log_file} (lines tagged [{result.pid}])",
+                err=True,
+            )
+        return False
+    click.echo(
+        f"Successfully imported {input_file} to {database_name} "
+        f"in {format_duration(result.elapsed)}"
+    )
+    usage = describe_usage(result)
+    if usage:
+        click.echo(usage)
+    return True
 
 
 def check_sqlpackage() -> None:
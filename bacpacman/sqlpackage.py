@@ -0,0 +1,551 @@
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+from .cache import cache_dir
+from .sampling import PhaseTiming, ProcessSampler, ResourceUsage
+
+# Seconds between Tick events while sqlpackage is quiet, so progress displays
+# can keep their elapsed time and throughput current during long tables.
+TICK_INTERVAL = 1.0
+
+# How much of the end of sqlpackage's stderr is kept in memory for error
+# reports, in KiB. Override with BACPACMAN_STDERR_TAIL_KB.
+DEFAULT_STDERR_TAIL_KB = 64
+
+# Lines read but not yet handled. The readers block when it is full, so a burst
+# of output is held back in the pipe rather than in memory.
+LINE_QUEUE_SIZE = 1000
+
+# The full output of every run goes to a rotating log file of this size.
+LOG_MAX_BYTES = 10 * 1024**2
+LOG_BACKUP_COUNT = 5
+
+# Every run also appends a JSON record of its phases and resource usage to
+# runs.jsonl next to the log, which is rotated once it reaches this size.
+RUN_RECORDS_MAX_BYTES = 10 * 1024**2
+
+# Retries of a run that failed with a transient error, and the backoff before
+# the first one, doubling each time up to MAX_RETRY_DELAY. Override with
+# BACPACMAN_RETRIES and BACPACMAN_RETRY_DELAY.
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_DELAY = 30.0
+MAX_RETRY_DELAY = 600.0
+
+# Errors worth another attempt: dropped connections, timeouts, throttling and
+# databases that are briefly unavailable (e.g. during a failover).
+_TRANSIENT_PATTERN = re.compile(
+    r"transport-level error|connection was (forcibly )?closed|connection reset"
+    r"|network-related|semaphore timeout|timeout expired|execution timeout"
+    r"|TCP Provider|physical connection is not usable|deadlock"
+    r"|\b(40197|40501|40613|49918|49919|49920|10928|10929|4221)\b",
+    re.IGNORECASE,
+)
+
+# Errors a retry cannot fix, even if the text also looks transient.
+_PERMANENT_PATTERN = re.compile(
+    r"login failed|\b18456\b|AADSTS|permission was denied|not enough space"
+    r"|disk full|could not find|does not exist|cannot open database"
+    r"|validation|not supported",
+    re.IGNORECASE,
+)
+
+# Seconds sqlpackage gets to exit after being asked to stop, before it is killed.
+TERMINATE_GRACE_SECONDS = 10.0
+
+_SECRET_ARGUMENTS = ("/sourcepassword:", "/targetpassword:", "/accesstoken:")
+_CONNECTION_STRING_SECRET = re.compile(
+    r'\b(Password|Pwd)=("(?:[^"]|"")*"|[^;]*)', re.IGNORECASE
+)
+
+_TABLE_PATTERN = re.compile(r"^Processing Table '(?P<table>.+)'\.?$")
+_WARNING_PATTERN = re.compile(r"^(\*\*\* |Warning\b|Error\b)", re.IGNORECASE)
+
+
+@dataclass
+class PhaseStarted:
+    """sqlpackage started a new phase, e.g. 'Extracting schema'."""
+
+    message: str
+
+
+@dataclass
+class TableStarted:
+    """sqlpackage started copying a table's data, e.g. '[dbo].[Orders]'."""
+
+    table: str
+
+
+@dataclass
+class OutputLine:
+    """A line of output that is not a phase or table, such as a warning."""
+
+    stream: str
+    text: str
+
+
+@dataclass
+class Tick:
+    """Sent every TICK_INTERVAL seconds while no output arrives."""
+
+
+ProgressEvent = PhaseStarted | TableStarted | OutputLine | Tick
+
+
+@dataclass
+class RunResult:
+    """The outcome of one sqlpackage run."""
+
+    returncode: int
+    stderr: str
+    elapsed: float
+    stderr_truncated: bool = False
+    log_file: Path | None = None
+    timed_out: bool = False
+    # Tags this run's lines in the shared log file.
+    pid: int | None = None
+    # None where processes cannot be sampled, or sampling is turned off.
+    usage: ResourceUsage | None = None
+    phases: list[PhaseTiming] = field(default_factory=list)
+
+    @property
+    def bottleneck(self) -> str | None:
+        """Whether the run was mostly held back by 'cpu', 'disk' or 'network'."""
+        return self.usage.bottleneck(self.elapsed) if self.usage else None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how soon to retry a run that failed transiently."""
+
+    retries: int = DEFAULT_RETRIES
+    delay: float = DEFAULT_RETRY_DELAY
+    max_delay: float = MAX_RETRY_DELAY
+
+    def backoff(self, retry: int) -> float:
+        """Seconds to wait before the given retry, counting from 1."""
+        delay = min(self.max_delay, self.delay * 2 ** (retry - 1))
+        # Jitter keeps parallel jobs that failed together from retrying together.
+        return delay * random.uniform(0.8, 1.2)
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Resolves the retry policy from BACPACMAN_RETRIES and BACPACMAN_RETRY_DELAY."""
+    policy = RetryPolicy()
+    with contextlib.suppress(ValueError):
+        policy.retries = max(0, int(os.getenv("BACPACMAN_RETRIES", "")))
+    with contextlib.suppress(ValueError):
+        policy.delay = max(0.0, float(os.getenv("BACPACMAN_RETRY_DELAY", "")))
+    return policy
+
+
+def is_transient(stderr: str) -> bool:
+    """Whether a failed run's error output suggests that retrying could help."""
+    return bool(_TRANSIENT_PATTERN.search(stderr)) and not _PERMANENT_PATTERN.search(
+        stderr
+    )
+
+
+def parse_line(stream: str, line: str) -> ProgressEvent | None:
+    """Turns one line of sqlpackage output into a progress event."""
+    text = line.strip()
+    if not text:
+        return None
+    if stream == "stdout":
+        match = _TABLE_PATTERN.match(text)
+        if match:
+            return TableStarted(match["table"])
+        if not _WARNING_PATTERN.match(text):
+            return PhaseStarted(text.rstrip("."))
+    return OutputLine(stream, text)
+
+
+class TailBuffer:
+    """Keeps the last ``max_bytes`` of lines, encoded as UTF-8, dropping the oldest."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.truncated = False
+        self._lines: deque[tuple[str, int]] = deque()
+        self._size = 0
+
+    def append(self, line: str) -> None:
+        encoded = line.encode()
+        if len(encoded) > self.max_bytes:
+            # Cutting may split a character; its remaining bytes are dropped.
+            line = encoded[-self.max_bytes :].decode(errors="ignore")
+            encoded = line.encode()
+            self.truncated = True
+        self._lines.append((line, len(encoded)))
+        self._size += len(encoded)
+        while self._size > self.max_bytes:
+            self._size -= self._lines.popleft()[1]
+            self.truncated = True
+
+    def __str__(self) -> str:
+        return "".join(line for line, _ in self._lines)
+
+
+def get_stderr_tail_bytes() -> int:
+    """Resolves the stderr tail size from BACPACMAN_STDERR_TAIL_KB."""
+    try:
+        kilobytes = int(os.getenv("BACPACMAN_STDERR_TAIL_KB", ""))
+    except ValueError:
+        kilobytes = DEFAULT_STDERR_TAIL_KB
+    return max(1, kilobytes) * 1024
+
+
+def log_file() -> Path:
+    """Returns the rotating log file that receives sqlpackage's full output."""
+    return cache_dir() / "logs" / "sqlpackage.log"
+
+
+def run_records_file() -> Path:
+    """Returns the file that receives a JSON record of every run."""
+    return cache_dir() / "logs" / "runs.jsonl"
+
+
+_records_lock = threading.Lock()
+
+
+def _argument(command: list[str], prefix: str) -> str | None:
+    for arg in command:
+        if arg.lower().startswith(prefix.lower()):
+            return arg[len(prefix) :]
+    return None
+
+
+def _write_run_record(command: list[str], result: "RunResult", started: float) -> None:
+    """Appends a run's timings and resource usage to run_records_file()."""
+    record = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+        "action": _argument(command, "/Action:"),
+        "server": _argument(command, "/SourceServerName:")
+        or _argument(command, "/TargetServerName:"),
+        "database": _argument(command, "/SourceDatabaseName:")
+        or _argument(command, "/TargetDatabaseName:"),
+        "returncode": result.returncode,
+        "timed_out": result.timed_out,
+        "elapsed_seconds": round(result.elapsed, 3),
+        "bottleneck": result.bottleneck,
+        "usage": asdict(result.usage) if result.usage else None,
+        "phases": [asdict(phase) for phase in result.phases],
+    }
+    path = run_records_file()
+    with _records_lock, contextlib.suppress(OSError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size >= RUN_RECORDS_MAX_BYTES:
+            os.replace(path, path.with_name(f"{path.name}.1"))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+# sqlpackage processes that are running, so cancel_all() can stop them.
+_running: set["subprocess.Popen[str]"] = set()
+_running_lock = threading.Lock()
+_cancelled = threading.Event()
+
+_logger = logging.getLogger("bacpacman.sqlpackage")
+_logger.propagate = False
+_logger_lock = threading.Lock()
+
+
+def _get_logger() -> logging.Logger | None:
+    """Attaches the rotating file handler on first use; None if it can't."""
+    path = log_file()
+    with _logger_lock:
+        for handler in _logger.handlers:
+            if getattr(handler, "baseFilename", None) == str(path.absolute()):
+                return _logger
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path,
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding="utf-8",
+            )
+        except OSError:
+            return None
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        return _logger
+
+
+def redact(command: list[str]) -> str:
+    """Joins a command for display, hiding passwords and tokens."""
+    return " ".join(
+        (
+            arg.split(":", 1)[0] + ":***"
+            if arg.lower().startswith(_SECRET_ARGUMENTS)
+            else _CONNECTION_STRING_SECRET.sub(r"\1=***", arg)
+        )
+        for arg in command
+    )
+
+
+def _read_lines(
+    name: str, pipe: IO[str], lines: "queue.Queue[tuple[str, str | None]]"
+) -> None:
+    with pipe:
+        for line in pipe:
+            lines.put((name, line))
+    lines.put((name, None))
+
+
+class RunCancelled(Exception):
+    """Raised when a run would start after cancel_all()."""
+
+
+def get_run_timeout() -> float | None:
+    """Resolves the longest a run may take, from BACPACMAN_SQLPACKAGE_TIMEOUT."""
+    try:
+        timeout = float(os.getenv("BACPACMAN_SQLPACKAGE_TIMEOUT", ""))
+    except ValueError:
+        return None
+    return timeout if timeout > 0 else None
+
+
+def _start(command: list[str], env: dict[str, str] | None) -> "subprocess.Popen[str]":
+    """
+    Starts sqlpackage in its own process group.
+
+    The group keeps Ctrl-C from reaching sqlpackage directly, so bacpacman
+    decides when and how it stops, and lets _terminate() stop everything
+    sqlpackage started along with it.
+    """
+    kwargs: dict[str, Any] = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        env=env,
+        **kwargs,
+    )
+
+
+def _terminate(process: "subprocess.Popen[str]") -> None:
+    """Asks sqlpackage's process group to stop, killing it after a grace period."""
+    if process.poll() is not None:
+        return
+    with contextlib.suppress(OSError):
+        if sys.platform == "win32":
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(TERMINATE_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        with contextlib.suppress(OSError):
+            if sys.platform == "win32":
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                    capture_output=True,
+                )
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def cancel_all() -> None:
+    """
+    Stops every running sqlpackage process and refuses to start new ones.
+
+    Used when a batch is interrupted, since worker threads never see Ctrl-C.
+    """
+    _cancelled.set()
+    with _running_lock:
+        running = list(_running)
+    for process in running:
+        _terminate(process)
+
+
+def reset_cancel() -> None:
+    """Allows runs to start again after cancel_all()."""
+    _cancelled.clear()
+
+
+def run(
+    command: list[str],
+    on_event: Callable[[ProgressEvent], None] | None = None,
+    env: dict[str, str] | None = None,
+    timeout: float | None = None,
+) -> RunResult:
+    """
+    Runs sqlpackage, passing its output to ``on_event`` as it is printed.
+
+    stdout and stderr are read line by line on background threads, so nothing
+    waits for the process to exit. Every line is written to the rotating log
+    file, and only the last BACPACMAN_STDERR_TAIL_KB of stderr is kept in
+    memory for error reports. Each phase's duration and the process group's
+    resource usage, sampled from /proc every BACPACMAN_SAMPLE_INTERVAL
+    seconds, are returned and appended to run_records_file().
+
+    sqlpackage is stopped, with anything it started, if it outlives
+    ``timeout`` (by default BACPACMAN_SQLPACKAGE_TIMEOUT seconds) or if this
+    is interrupted. Raises FileNotFoundError if sqlpackage is not installed,
+    and RunCancelled after cancel_all().
+    """
+    if _cancelled.is_set():
+        raise RunCancelled("sqlpackage runs were cancelled")
+    timeout = timeout if timeout is not None else get_run_timeout()
+    logger = _get_logger()
+    started_at = time.time()
+    started = time.monotonic()
+    process = _start(command, env)
+    # Parallel runs share the log, so every line is tagged with the run's pid.
+    if logger is not None:
+        logger.info("[%d] run: %s", process.pid, redact(command))
+    with _running_lock:
+        _running.add(process)
+    sampler = ProcessSampler(process.pid)
+    phases: list[PhaseTiming] = []
+    phase, phase_started = "Starting sqlpackage", started
+
+    def end_phase() -> None:
+        now = time.monotonic()
+        phases.append(
+            PhaseTiming(
+                phase,
+                phase_started - started,
+                now - phase_started,
+                sampler.checkpoint(),
+            )
+        )
+
+    try:
+        sampler.start()
+        assert process.stdout is not None and process.stderr is not None
+        lines: queue.Queue[tuple[str, str | None]] = queue.Queue(LINE_QUEUE_SIZE)
+        for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+            threading.Thread(
+                target=_read_lines,
+                args=(name, pipe, lines),
+                name=f"sqlpackage-{name}",
+                daemon=True,
+            ).start()
+
+        stderr = TailBuffer(get_stderr_tail_bytes())
+        timed_out = False
+        open_streams = 2
+        while open_streams:
+            if (
+                timeout is not None
+                and not timed_out
+                and time.monotonic() - started > timeout
+            ):
+                timed_out = True
+                _terminate(process)
+            try:
+                stream, line = lines.get(timeout=TICK_INTERVAL)
+            except queue.Empty:
+                if on_event is not None:
+                    on_event(Tick())
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+            if logger is not None:
+                logger.info("[%d] %s: %s", process.pid, stream, line.rstrip("\n"))
+            if stream == "stderr":
+                stderr.append(line)
+            event = parse_line(stream, line)
+            if isinstance(event, PhaseStarted):
+                end_phase()
+                phase, phase_started = event.message, time.monotonic()
+            if event is not None and on_event is not None:
+                on_event(event)
+        # sqlpackage has exited but is not reaped yet, so it can still be read.
+        end_phase()
+        returncode = process.wait()
+    except BaseException:
+        # Interrupted, e.g. by Ctrl-C: don't leave sqlpackage running.
+        _terminate(process)
+        if logger is not None:
+            logger.info("[%d] interrupted", process.pid)
+        raise
+    finally:
+        with _running_lock:
+            _running.discard(process)
+        usage = sampler.stop()
+
+    if timed_out:
+        stderr.append(f"bacpacman: stopped sqlpackage after {timeout:.0f}s.\n")
+    if logger is not None:
+        logger.info("[%d] exit: %d", process.pid, returncode)
+    result = RunResult(
+        returncode=returncode,
+        stderr=str(stderr),
+        elapsed=time.monotonic() - started,
+        stderr_truncated=stderr.truncated,
+        log_file=log_file() if logger is not None else None,
+        pid=process.pid,
+        timed_out=timed_out,
+        usage=usage if sampler.enabled else None,
+        phases=phases,
+    )
+    _write_run_record(command, result, started_at)
+    return result
+
+
+def run_with_retries(
+    build_command: Callable[[], list[str]],
+    on_event: Callable[[ProgressEvent], None] | None = None,
+    env: dict[str, str] | None = None,
+    policy: RetryPolicy | None = None,
+    on_retry: Callable[[int, float, RunResult], None] | None = None,
+) -> RunResult:
+    """
+    Runs sqlpackage, retrying with exponential backoff after transient errors.
+
+    ``build_command`` is called for every attempt, so each one can be given
+    fresh credentials. ``on_retry`` is called with the retry number, the delay
+    and the failed result before waiting. Returns the last attempt's result.
+    """
+    policy = policy or get_retry_policy()
+    retry = 0
+    while True:
+        result = run(build_command(), on_event, env)
+        if (
+            result.succeeded
+            or result.timed_out
+            or retry >= policy.retries
+            or not is_transient(result.stderr)
+        ):
+            return result
+        retry += 1
+        delay = policy.backoff(retry)
+        if on_retry is not None:
+            on_retry(retry, delay, result)
+        if _cancelled.wait(delay):
+            return result
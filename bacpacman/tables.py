@@ -0,0 +1,178 @@
+import fnmatch
+import os
+import struct
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from azure.core.exceptions import ClientAuthenticationError
+from azure.identity import CredentialUnavailableError
+
+from . import azure_handler
+
+if TYPE_CHECKING:
+    import pyodbc
+
+# Connection attribute for passing an Entra ID access token to the ODBC driver.
+_SQL_COPT_SS_ACCESS_TOKEN = 1256
+
+DEFAULT_ODBC_DRIVER = "ODBC Driver 18 for SQL Server"
+
+_TABLE_SIZES_QUERY = """
+SELECT s.name, t.name,
+    SUM(ps.reserved_page_count) * 8192,
+    SUM(CASE WHEN ps.index_id IN (0, 1) THEN ps.row_count ELSE 0 END)
+FROM sys.dm_db_partition_stats AS ps
+JOIN sys.tables AS t ON t.object_id = ps.object_id
+JOIN sys.schemas AS s ON s.schema_id = t.schema_id
+WHERE t.is_ms_shipped = 0
+GROUP BY s.name, t.name
+ORDER BY 3 DESC
+"""
+
+
+class TablesUnavailableError(Exception):
+    """Raised when table sizes cannot be read, e.g. because pyodbc is missing."""
+
+
+@dataclass
+class TableInfo:
+    """A user table and the space it takes up."""
+
+    schema: str
+    name: str
+    size_bytes: int
+    rows: int
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+
+def _quote(value: str) -> str:
+    """Braces an ODBC connection string value, doubling any closing braces."""
+    return "{" + value.replace("}", "}}") + "}"
+
+
+def _connect(
+    server_name: str,
+    database_name: str,
+    username: str | None,
+    password: str | None,
+    read_only: bool,
+) -> "pyodbc.Connection":
+    try:
+        import pyodbc
+    except ImportError as e:
+        raise TablesUnavailableError(
+            "Listing tables needs pyodbc and the Microsoft ODBC driver "
+            "(pip install 'bacpacman[tables]')."
+        ) from e
+
+    driver = os.getenv("BACPACMAN_ODBC_DRIVER", DEFAULT_ODBC_DRIVER)
+    connection_string = (
+        f"Driver={{{driver}}};"
+        f"Server=tcp:{server_name}.database.windows.net,1433;"
+        f"Database={_quote(database_name)};Encrypt=yes;TrustServerCertificate=no;"
+    )
+    if read_only:
+        connection_string += "ApplicationIntent=ReadOnly;"
+    attrs_before: dict[int, bytes] = {}
+    if username and password:
+        connection_string += f"Uid={_quote(username)};Pwd={_quote(password)};"
+    else:
+        try:
+            token = azure_handler.get_sql_access_token()
+        except (CredentialUnavailableError, ClientAuthenticationError) as e:
+            raise TablesUnavailableError(
+                f"Could not get an access token for {database_name}: {e.message}"
+            ) from e
+        encoded = token.encode("utf-16-le")
+        attrs_before[_SQL_COPT_SS_ACCESS_TOKEN] = struct.pack(
+            f"<I{len(encoded)}s", len(encoded), encoded
+        )
+    try:
+        return pyodbc.connect(connection_string, attrs_before=attrs_before)
+    except pyodbc.Error as e:
+        raise TablesUnavailableError(
+            f"Could not connect to {database_name}: {e}"
+        ) from e
+
+
+def list_tables(
+    server_name: str,
+    database_name: str,
+    username: str | None = None,
+    password: str | None = None,
+    read_only: bool = False,
+) -> list[TableInfo]:
+    """
+    Lists a database's user tables, largest first.
+
+    Connects with the SQL login if one is given, otherwise with an Entra ID
+    token from the shared Azure credential. With ``read_only`` the query is
+    routed to a readable replica.
+    """
+    connection = _connect(server_name, database_name, username, password, read_only)
+    try:
+        rows = connection.cursor().execute(_TABLE_SIZES_QUERY).fetchall()
+    finally:
+        connection.close()
+    return [
+        TableInfo(row[0], row[1], int(row[2] or 0), int(row[3] or 0)) for row in rows
+    ]
+
+
+def _normalize(pattern: str) -> str:
+    """Turns '[dbo].[Orders]', 'dbo.Orders' or 'Orders' into 'dbo.orders'."""
+    pattern = pattern.replace("[", "").replace("]", "").strip()
+    if "." not in pattern:
+        pattern = f"dbo.{pattern}"
+    return pattern.lower()
+
+
+def matches(table: TableInfo, patterns: Iterable[str]) -> bool:
+    """Whether a table matches any of the names or glob patterns."""
+    name = table.qualified_name.lower()
+    return any(fnmatch.fnmatchcase(name, _normalize(p)) for p in patterns)
+
+
+def needs_listing(include: Iterable[str], exclude: Iterable[str]) -> bool:
+    """Whether resolving these filters needs the database's table list."""
+    return bool(list(exclude)) or any(
+        "*" in pattern or "?" in pattern for pattern in include
+    )
+
+
+def select_tables(
+    tables: list[TableInfo], include: Iterable[str], exclude: Iterable[str]
+) -> list[TableInfo]:
+    """
+    Returns the tables whose data should be exported.
+
+    With ``include``, only matching tables are kept; ``exclude`` then drops
+    matching tables. Raises ValueError if no table is left, because sqlpackage
+    exports every table's data when none is named.
+    """
+    include = list(include)
+    exclude = list(exclude)
+    selected = [
+        table
+        for table in tables
+        if (not include or matches(table, include)) and not matches(table, exclude)
+    ]
+    if not selected:
+        raise ValueError("The table filters leave no table data to export.")
+    return selected
+
+
+def table_data_arguments(table_names: Iterable[str]) -> list[str]:
+    """Returns the /p:TableData arguments that limit an export to these tables."""
+    arguments = []
+    for name in table_names:
+        normalized = name.replace("[", "").replace("]", "")
+        if "." not in normalized:
+            normalized = f"dbo.{normalized}"
+        schema, table = normalized.split(".", 1)
+        arguments.append(f"/p:TableData=[{schema}].[{table}]")
+    return arguments
@@ -1,21 +1,45 @@
 import glob
 import os
 
+import keyring.errors
 import questionary
 from azure.core.exceptions import ClientAuthenticationError, ServiceRequestError
-from dotenv import set_key
+from dotenv import dotenv_values, set_key
 from questionary import Choice
 
-from . import azure_handler, sql_handler
+from . import azure_handler, cache, picker, planning, profiles, sql_handler, tables
+from .azure_handler import DatabaseRecord
 from .config import custom_style
 
 
-def run_interactive_workflow() -> None:
-    """Runs the full end-to-end interactive workflow."""
+def run_interactive_workflow(refresh: bool = False) -> None:
+    """
+    Runs the full end-to-end interactive workflow.
+
+    Discovered subscriptions, servers and databases are served from the local
+    cache when available; pass ``refresh`` to fetch them from Azure instead.
+    """
     questionary.print(
         "Starting the full BacPacman workflow...", style="bold fg:#673ab7"
     )
 
+    # While the user answers the first prompts, start listing servers for the
+    # subscription used last time, and databases for the server used last time.
+    saved = dotenv_values(".env")
+    likely_subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID") or saved.get(
+        "AZURE_SUBSCRIPTION_ID"
+    )
+    last_server_name = saved.get("BACPACMAN_LAST_SERVER")
+    if likely_subscription_id:
+        cache.prefetch_servers(likely_subscription_id, refresh)
+        if last_server_name:
+            cache.prefetch_databases(
+                likely_subscription_id,
+                last_server_name,
+                saved.get("BACPACMAN_LAST_RESOURCE_GROUP"),
+                refresh,
+            )
+
     # 1. Choose Authentication Method
     auth_method_choice = questionary.select(
         "How would you like to authenticate to the database?",
@@ -27,16 +51,18 @@ def run_interactive_workflow() -> None:
     ).ask()
 
     if not auth_method_choice:
+        azure_handler.cancel_prefetch()
         return
 
     selected_server_name: str | None = None
     selected_database_name: str | None = None
+    selected_database: DatabaseRecord | None = None
     username: str | None = None
 
     try:
         # 2. Login & Discover Resources via Azure
         questionary.print("Fetching subscriptions...", style="bold")
-        subscriptions = azure_handler.list_subscriptions()
+        subscriptions = cache.list_subscriptions(refresh)
 
         # 3. Select Subscription
         subscription_choices = [
@@ -50,50 +76,69 @@ def run_interactive_workflow() -> None:
         subscription_id = questionary.select(
             "Select your Azure subscription:",
             choices=subscription_choices,
+            default=next(
+                (c for c in subscription_choices if c.value == likely_subscription_id),
+                None,
+            ),
             style=custom_style,
         ).ask()
         if not subscription_id:
             return
         set_key(".env", "AZURE_SUBSCRIPTION_ID", subscription_id)
         questionary.print(f"Selected subscription: {subscription_id}", style="bold")
+        azure_handler.cancel_prefetch(subscription_id, last_server_name)
 
-        # 4. List and Select Server
-        questionary.print("Fetching servers...", style="bold")
-        servers = list(azure_handler.list_servers(subscription_id))
-        if not servers:
+        # 4. List and Select Server. The picker opens as soon as the first page
+        # of servers arrives and keeps filling in while the user browses.
+        try:
+            selected_server = picker.stream_select(
+                "Select the SQL server:",
+                cache.list_servers(subscription_id, refresh),
+                title=lambda s: s.name or "Unnamed",
+                # Start listing databases for whichever server is highlighted.
+                on_highlight=lambda s: cache.prefetch_databases(
+                    subscription_id,
+                    s.name or "",
+                    azure_handler.resource_group_from_id(s.id or ""),
+                    refresh,
+                ),
+            )
+        except picker.NoChoicesError:
             questionary.print(
                 "No SQL servers found in the selected subscription.",
                 style="bold fg:yellow",
             )
             return
-
-        server_choices = [Choice(s.name, s) for s in servers]
-        selected_server = questionary.select(
-            "Select the SQL server:", choices=server_choices, style=custom_style
-        ).ask()
         if not selected_server or not selected_server.name:
             return
         selected_server_name = selected_server.name
+        azure_handler.cancel_prefetch(subscription_id, selected_server_name)
+        set_key(".env", "BACPACMAN_LAST_SERVER", selected_server_name)
+        resource_group_name = azure_handler.resource_group_from_id(
+            selected_server.id or ""
+        )
+        if resource_group_name:
+            set_key(".env", "BACPACMAN_LAST_RESOURCE_GROUP", resource_group_name)
 
         # 5. List and Select Database
-        questionary.print("Fetching databases...", style="bold")
         if selected_server_name:
-            databases = list(
-                azure_handler.list_databases(subscription_id, selected_server_name)
-            )
-            if not databases:
+            try:
+                selected_database = picker.stream_select(
+                    "Select the database:",
+                    cache.list_databases(
+                        subscription_id, selected_server_name, refresh
+                    ),
+                    title=planning.describe_database,
+                )
+            except picker.NoChoicesError:
                 questionary.print(
                     "No databases found on the specified server.",
                     style="bold fg:yellow",
                 )
                 return
-
-            db_choices = [Choice(db.name, db.name) for db in databases]
-            selected_database_name = questionary.select(
-                "Select the database:", choices=db_choices, style=custom_style
-            ).ask()
-            if not selected_database_name:
+            if not selected_database or not selected_database.name:
                 return
+            selected_database_name = selected_database.name
 
     except (ClientAuthenticationError, ServiceRequestError) as e:
         questionary.print(
@@ -109,6 +154,8 @@ def run_interactive_workflow() -> None:
         questionary.print("Falling back to manual entry.\n", style="fg:yellow")
         selected_server_name = questionary.text("Enter the server name:").ask()
         selected_database_name = questionary.text("Enter the database name:").ask()
+    finally:
+        azure_handler.cancel_prefetch()
 
     # 6. Get credentials if using SQL Auth
     if auth_method_choice == "sql":
@@ -123,15 +170,58 @@ def run_interactive_workflow() -> None:
 
     # 7. Extract Bacpac
     if selected_server_name and selected_database_name:
+        # 7a. Optionally limit which tables' data is exported
+        selected_tables = _choose_tables(
+            selected_server_name, selected_database_name, auth_method_choice, username
+        )
         output_file = f"{selected_database_name}.bacpac"
         summary = (
             f"Server: {selected_server_name}\n"
             f"Database: {selected_database_name}\n"
             f"Output File: {output_file}"
         )
+        plan = None
+        if selected_database is not None:
+            plan = planning.plan_export(selected_database)
+        if selected_tables is not None:
+            data_bytes = sum(table.size_bytes for table in selected_tables)
+            summary += (
+                f"\nTable Data: {len(selected_tables)} tables "
+                f"({planning.format_size(data_bytes)})"
+            )
+            if plan:
+                plan = planning.ExportPlan(
+                    database_bytes=data_bytes,
+                    estimated_bacpac_bytes=data_bytes
+                    * planning.BACPAC_COMPRESSION_RATIO,
+                    estimated_seconds=plan.estimated_seconds
+                    * data_bytes
+                    / max(plan.database_bytes, 1),
+                )
+        preflight = None
+        if plan:
+            summary += (
+                f"\nDatabase Size: {planning.format_size(plan.database_bytes)}\n"
+                "Estimated Bacpac Size: "
+                f"{planning.format_size(plan.estimated_bacpac_bytes)}\n"
+                "Estimated Duration: "
+                f"{planning.format_duration(plan.estimated_seconds)} (rough)"
+            )
+            preflight = planning.preflight_export(
+                plan.database_bytes,
+                output_file,
+                profiles.select_profile(plan.database_bytes),
+            )
+            if preflight.temp_directory:
+                summary += f"\nTemp Directory: {preflight.temp_directory}"
         questionary.print("\nSummary:", style="bold")
         questionary.print(summary)
-        proceed = questionary.confirm("Proceed with the extraction?").ask()
+        fits = preflight is None or preflight.ok
+        for problem in preflight.problems if preflight else []:
+            questionary.print(f"Warning: {problem}", style="bold fg:yellow")
+        proceed = questionary.confirm(
+            "Proceed with the extraction?", default=fits
+        ).ask()
         if proceed:
             sql_handler.extract_bacpac(
                 selected_server_name,
@@ -139,11 +229,69 @@ def run_interactive_workflow() -> None:
                 output_file,
                 auth_method_choice,
                 username,
+                plan,
+                # The user has already seen and accepted any space warnings.
+                check_space=False,
+                include_tables=(
+                    [table.qualified_name for table in selected_tables]
+                    if selected_tables is not None
+                    else None
+                ),
             )
         else:
             questionary.print("Extraction cancelled.", style="bold fg:red")
 
 
+def _choose_tables(
+    server_name: str, database_name: str, auth_method: str, username: str | None
+) -> list[tables.TableInfo] | None:
+    """
+    Asks which tables' data to export, largest first.
+
+    Returns None to export every table's data.
+    """
+    choice = questionary.select(
+        "Which table data should be exported?",
+        choices=[
+            Choice("All tables", "all"),
+            Choice("Choose tables (largest first)", "choose"),
+        ],
+        style=custom_style,
+    ).ask()
+    if choice != "choose":
+        return None
+    try:
+        password = None
+        if auth_method == "sql" and username:
+            password = sql_handler.get_password(server_name, username)
+        listed = tables.list_tables(server_name, database_name, username, password)
+    except (tables.TablesUnavailableError, keyring.errors.NoKeyringError) as e:
+        questionary.print(
+            f"Could not list tables ({e}); exporting every table's data.",
+            style="bold fg:yellow",
+        )
+        return None
+    if not listed:
+        return None
+    chosen = questionary.checkbox(
+        "Deselect the tables whose data you don't need:",
+        choices=[
+            Choice(
+                f"{table.qualified_name}  ({planning.format_size(table.size_bytes)}, "
+                f"{table.rows:,} rows)",
+                table,
+                checked=True,
+            )
+            for table in listed
+        ],
+        style=custom_style,
+    ).ask()
+    if not chosen or len(chosen) == len(listed):
+        # sqlpackage exports every table's data when none is named.
+        return None
+    return list(chosen)
+
+
 def run_import_workflow(server_name_override: str | None) -> None:
     """Runs the interactive workflow for importing a bacpac file."""
     questionary.print(
@@ -0,0 +1,220 @@
+"""
+Offline discovery benchmarks against a fake Azure fleet.
+
+Measures API calls, wall time and peak traced memory for each discovery path
+without touching the network:
+
+    python benchmarks/discovery_benchmark.py
+    python benchmarks/discovery_benchmark.py --latency 0.05 --json results.json
+    python benchmarks/discovery_benchmark.py --baseline results.json
+
+With --baseline, the run fails if any scenario makes more API calls than the
+baseline, or is slower or uses more memory by more than --tolerance.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any
+from unittest import mock
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeFleet, installed  # noqa: E402
+
+from bacpacman import azure_handler, inventory, picker, ui  # noqa: E402
+
+
+@dataclass
+class Result:
+    """The measurements for one scenario."""
+
+    scenario: str
+    api_calls: int
+    wall_time: float
+    peak_memory: int
+    calls_by_operation: dict[str, int]
+
+
+@contextmanager
+def _isolated() -> Iterator[None]:
+    """Runs with an empty cache, resource group index and working directory."""
+    cwd = os.getcwd()
+    with (
+        tempfile.TemporaryDirectory() as workdir,
+        mock.patch.dict(os.environ, {"BACPACMAN_CACHE_DIR": workdir}),
+        mock.patch.dict(azure_handler._resource_groups, clear=True),
+    ):
+        os.chdir(workdir)
+        try:
+            yield
+        finally:
+            azure_handler.cancel_prefetch()
+            os.chdir(cwd)
+
+
+def _measure(
+    fleet: FakeFleet,
+    scenario: str,
+    run: Callable[[], object],
+    prepare: Callable[[], object] | None = None,
+) -> Result:
+    with _isolated():
+        if prepare is not None:
+            prepare()
+        fleet.reset()
+        tracemalloc.start()
+        started = time.perf_counter()
+        run()
+        wall_time = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return Result(
+        scenario=scenario,
+        api_calls=sum(fleet.calls.values()),
+        wall_time=wall_time,
+        peak_memory=peak,
+        calls_by_operation=dict(fleet.calls),
+    )
+
+
+def _interactive_selection(fleet: FakeFleet) -> None:
+    """Drives the interactive workflow, always taking the first choice."""
+
+    class Answer:
+        def __init__(self, value: Any) -> None:
+            self.value = value
+
+        def ask(self) -> Any:
+            return self.value
+
+    def select(message: str, choices: list[Any], **kwargs: Any) -> Answer:
+        first = choices[0]
+        return Answer(getattr(first, "value", first))
+
+    def stream_select(message: str, items: Any, title: Any, **kwargs: Any) -> Any:
+        return next(iter(items), None)
+
+    with (
+        mock.patch.object(ui.questionary, "select", select),
+        mock.patch.object(ui.questionary, "confirm", lambda *a, **k: Answer(False)),
+        mock.patch.object(ui.questionary, "print", lambda *a, **k: None),
+        mock.patch.object(picker, "stream_select", stream_select),
+    ):
+        ui.run_interactive_workflow(refresh=True)
+
+
+def run_scenarios(fleet: FakeFleet, max_workers: int, full: bool) -> list[Result]:
+    subscription_id = fleet.subscription_id(0)
+    server_name = fleet.server_id(subscription_id, fleet.servers_per_subscription - 1)
+    server_name = server_name.rsplit("/", 1)[-1]
+
+    def list_servers() -> object:
+        return list(azure_handler.list_servers(subscription_id))
+
+    def list_databases() -> object:
+        return list(azure_handler.list_databases(subscription_id, server_name))
+
+    scenarios: list[tuple[str, Callable[[], object], Callable[[], object] | None]] = [
+        ("list_subscriptions", azure_handler.list_subscriptions, None),
+        ("list_servers", list_servers, None),
+        ("list_databases (cold index)", list_databases, None),
+        # The index is filled by listing servers first, as the workflow does.
+        ("list_databases (warm index)", list_databases, list_servers),
+        ("interactive selection", lambda: _interactive_selection(fleet), None),
+    ]
+    if full:
+        scenarios += [
+            ("inventory (sequential)", inventory.collect_inventory_sequential, None),
+            (
+                f"inventory (workers={max_workers})",
+                lambda: inventory.collect_inventory(max_workers=max_workers),
+                None,
+            ),
+        ]
+    with installed(fleet):
+        return [_measure(fleet, name, run, prepare) for name, run, prepare in scenarios]
+
+
+def _regressions(
+    results: list[Result], baseline: dict[str, dict[str, Any]], tolerance: float
+) -> list[str]:
+    problems: list[str] = []
+    for result in results:
+        previous = baseline.get(result.scenario)
+        if previous is None:
+            continue
+        if result.api_calls > previous["api_calls"]:
+            problems.append(
+                f"{result.scenario}: {result.api_calls} API calls, "
+                f"baseline {previous['api_calls']}"
+            )
+        for metric in ("wall_time", "peak_memory"):
+            limit = previous[metric] * (1 + tolerance)
+            if getattr(result, metric) > limit and previous[metric] > 0:
+                problems.append(
+                    f"{result.scenario}: {metric} {getattr(result, metric):.4g}, "
+                    f"baseline {previous[metric]:.4g}"
+                )
+    return problems
+
+
+@click.command()
+@click.option("--subscriptions", default=50, show_default=True)
+@click.option("--servers", default=200, show_default=True, help="Per subscription.")
+@click.option("--databases", default=30, show_default=True, help="Per server.")
+@click.option("--page-size", default=100, show_default=True)
+@click.option(
+    "--latency", default=0.0, show_default=True, help="Seconds per page fetched."
+)
+@click.option("--max-workers", default=inventory.DEFAULT_MAX_WORKERS, show_default=True)
+@click.option("--full", is_flag=True, help="Also walk the whole fleet's inventory.")
+@click.option("--json", "json_path", type=click.Path(), help="Write results here.")
+@click.option("--baseline", type=click.Path(exists=True), help="Results to compare.")
+@click.option("--tolerance", default=0.25, show_default=True)
+def main(
+    subscriptions: int,
+    servers: int,
+    databases: int,
+    page_size: int,
+    latency: float,
+    max_workers: int,
+    full: bool,
+    json_path: str | None,
+    baseline: str | None,
+    tolerance: float,
+) -> None:
+    """Benchmarks discovery against a fake Azure fleet."""
+    fleet = FakeFleet(subscriptions, servers, databases, page_size, latency)
+    results = run_scenarios(fleet, max_workers, full)
+
+    click.echo(f"{'scenario':<30} {'calls':>7} {'wall (s)':>10} {'peak (KiB)':>11}")
+    for result in results:
+        click.echo(
+            f"{result.scenario:<30} {result.api_calls:>7} "
+            f"{result.wall_time:>10.3f} {result.peak_memory / 1024:>11.0f}"
+        )
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({r.scenario: asdict(r) for r in results}, f, indent=2)
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            problems = _regressions(results, json.load(f), tolerance)
+        for problem in problems:
+            click.echo(f"Regression: {problem}", err=True)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+In-process fakes for the Azure SDK clients used during discovery.
+
+The fakes page through a synthetic fleet with azure-core's real ItemPaged, so
+discovery code sees the same lazy, page-at-a-time behaviour as it does against
+Azure. Every page fetched counts as one API call.
+"""
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.paging import ItemPaged
+
+from bacpacman import azure_handler
+from bacpacman.azure_handler import DatabaseRecord, ServerRecord, SubscriptionRecord
+
+
+@dataclass
+class FakeFleet:
+    """The shape of the synthetic tenant and how slowly it answers."""
+
+    subscriptions: int = 50
+    servers_per_subscription: int = 200
+    databases_per_server: int = 30
+    page_size: int = 100
+    latency: float = 0.0
+    calls: Counter[str] = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def subscription_id(self, index: int) -> str:
+        return f"00000000-0000-0000-0000-{index:012d}"
+
+    def server_id(self, subscription_id: str, index: int) -> str:
+        return (
+            f"/subscriptions/{subscription_id}/resourceGroups/rg-{index % 10}"
+            f"/providers/Microsoft.Sql/servers/sql-{subscription_id[-4:]}-{index}"
+        )
+
+    def pager(
+        self, operation: str, count: int, make: Callable[[int], object]
+    ) -> ItemPaged[object]:
+        """Returns a pager that fetches ``count`` items ``page_size`` at a time."""
+
+        def get_next(continuation_token: int | None) -> tuple[int | None, list[object]]:
+            start = continuation_token or 0
+            with self._lock:
+                self.calls[operation] += 1
+            if self.latency:
+                time.sleep(self.latency)
+            end = min(start + self.page_size, count)
+            return (end if end < count else None), [make(i) for i in range(start, end)]
+
+        def extract_data(
+            page: tuple[int | None, list[object]],
+        ) -> tuple[int | None, Iterator[object]]:
+            return page[0], iter(page[1])
+
+        return ItemPaged(get_next, extract_data)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+
+class _FakeSubscriptions:
+    def __init__(self, fleet: FakeFleet) -> None:
+        self._fleet = fleet
+
+    def list(self) -> ItemPaged[object]:
+        fleet = self._fleet
+        return fleet.pager(
+            "subscriptions.list",
+            fleet.subscriptions,
+            lambda i: SubscriptionRecord(f"Subscription {i}", fleet.subscription_id(i)),
+        )
+
+
+class _FakeServers:
+    def __init__(self, fleet: FakeFleet, subscription_id: str) -> None:
+        self._fleet = fleet
+        self._subscription_id = subscription_id
+
+    def list(self) -> ItemPaged[object]:
+        fleet = self._fleet
+
+        def make(i: int) -> ServerRecord:
+            server_id = fleet.server_id(self._subscription_id, i)
+            return ServerRecord(server_id.rsplit("/", 1)[-1], server_id)
+
+        return fleet.pager("servers.list", fleet.servers_per_subscription, make)
+
+
+class _FakeDatabases:
+    def __init__(self, fleet: FakeFleet, subscription_id: str) -> None:
+        self._fleet = fleet
+        self._subscription_id = subscription_id
+
+    def list_by_server(
+        self, resource_group_name: str, server_name: str
+    ) -> ItemPaged[object]:
+        prefix = (
+            f"/subscriptions/{self._subscription_id}/resourceGroups/"
+            f"{resource_group_name}/providers/Microsoft.Sql/servers/{server_name}"
+        )
+        return self._fleet.pager(
+            "databases.list_by_server",
+            self._fleet.databases_per_server,
+            lambda i: DatabaseRecord(f"db-{i}", f"{prefix}/databases/db-{i}"),
+        )
+
+
+class _FakeDatabaseUsages:
+    def __init__(self, fleet: FakeFleet) -> None:
+        self._fleet = fleet
+
+    def list_by_database(
+        self, resource_group_name: str, server_name: str, database_name: str
+    ) -> ItemPaged[object]:
+        return self._fleet.pager(
+            "database_usages.list_by_database",
+            1,
+            lambda i: SimpleNamespace(
+                name="database_size", current_value=256 * 1024**2, limit=None
+            ),
+        )
+
+
+class FakeSubscriptionClient:
+    def __init__(self, fleet: FakeFleet) -> None:
+        self.subscriptions = _FakeSubscriptions(fleet)
+
+
+class FakeSqlClient:
+    def __init__(self, fleet: FakeFleet, subscription_id: str) -> None:
+        self.servers = _FakeServers(fleet, subscription_id)
+        self.databases = _FakeDatabases(fleet, subscription_id)
+        self.database_usages = _FakeDatabaseUsages(fleet)
+
+
+@contextmanager
+def installed(fleet: FakeFleet) -> Iterator[FakeFleet]:
+    """Routes azure_handler's client factories to the fake fleet."""
+    with (
+        mock.patch.object(
+            azure_handler,
+            "get_subscription_client",
+            lambda: FakeSubscriptionClient(fleet),
+        ),
+        mock.patch.object(
+            azure_handler,
+            "get_sql_client",
+            lambda subscription_id: FakeSqlClient(fleet, subscription_id),
+        ),
+        mock.patch.dict("os.environ", {"BACPACMAN_DISCOVERY_BACKEND": "arm"}),
+    ):
+        yield fleet
@@ -0,0 +1,61 @@
+"""
+Compares the wall-clock time of sequential and concurrent inventory discovery.
+
+Runs against the subscriptions your Azure CLI login can see:
+
+    python benchmarks/inventory_benchmark.py --max-workers 4 --max-workers 16
+"""
+
+import time
+from collections.abc import Callable
+
+import click
+
+from bacpacman import azure_handler, inventory
+
+
+def _timed(label: str, run: Callable[[], inventory.Inventory]) -> float:
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    database_count = sum(len(entry.databases) for entry in result.servers)
+    click.echo(
+        f"{label:<24} {elapsed:8.2f}s  "
+        f"{len(result.servers)} servers, {database_count} databases"
+    )
+    return elapsed
+
+
+@click.command()
+@click.option(
+    "--max-workers",
+    "worker_counts",
+    type=int,
+    multiple=True,
+    help="Concurrency cap to measure. May be repeated.",
+)
+@click.option(
+    "--subscription-id",
+    "subscription_ids",
+    multiple=True,
+    help="Limit discovery to this subscription. May be repeated.",
+)
+def main(worker_counts: tuple[int, ...], subscription_ids: tuple[str, ...]) -> None:
+    """Times sequential discovery against the concurrent inventory."""
+    selected = subscription_ids or None
+    # Authenticate up front so neither path pays for the first token.
+    azure_handler.list_subscriptions()
+
+    baseline = _timed(
+        "sequential", lambda: inventory.collect_inventory_sequential(selected)
+    )
+    for workers in worker_counts or (inventory.DEFAULT_MAX_WORKERS,):
+        elapsed = _timed(
+            f"concurrent (workers={workers})",
+            lambda: inventory.collect_inventory(selected, workers),
+        )
+        click.echo(f"{'':<24} {baseline / elapsed:8.1f}x faster than sequential")
+
+
+if __name__ == "__main__":
+    main()
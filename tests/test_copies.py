@@ -0,0 +1,90 @@
+import contextlib
+import io
+import unittest
+from typing import Any, cast
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError
+from azure.core.polling import LROPoller
+
+from bacpacman import copies
+
+
+class FakePoller:
+    """Stands in for an LROPoller, raising ``error`` from result() if given."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+
+    def result(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+
+class FakeDatabases:
+    """Records the databases deleted through it."""
+
+    def __init__(self, delete_error: Exception | None = None) -> None:
+        self.delete_error = delete_error
+        self.deleted: list[str] = []
+
+    def begin_delete(self, resource_group: str, server: str, name: str) -> Any:
+        self.deleted.append(name)
+        return FakePoller(self.delete_error)
+
+
+class ExportFromCopyTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.copy = copies.DatabaseCopy(
+            subscription_id="sub",
+            resource_group_name="rg",
+            server_name="server",
+            database_name="orders",
+            copy_name="orders-bacpacman-1234abcd",
+            poller=cast(LROPoller[Any], FakePoller()),
+        )
+        self.stderr = io.StringIO()
+
+    def export_from_copy(self, databases: FakeDatabases, export: Any) -> None:
+        """Runs export_from_copy against ``databases``, capturing stderr."""
+        client = mock.Mock(databases=databases)
+        with (
+            mock.patch.object(copies.azure_handler, "get_sql_client", lambda _: client),
+            contextlib.redirect_stderr(self.stderr),
+        ):
+            copies.export_from_copy(self.copy, export)
+
+    def test_drops_copy_after_export(self) -> None:
+        databases = FakeDatabases()
+        self.export_from_copy(databases, lambda: True)
+        self.assertEqual(databases.deleted, [self.copy.copy_name])
+
+    def test_drops_copy_when_export_fails(self) -> None:
+        databases = FakeDatabases()
+
+        def export() -> bool:
+            raise RuntimeError("export failed")
+
+        with self.assertRaisesRegex(RuntimeError, "export failed"):
+            self.export_from_copy(databases, export)
+        self.assertEqual(databases.deleted, [self.copy.copy_name])
+
+    def test_reports_failed_drop_without_hiding_export_error(self) -> None:
+        databases = FakeDatabases(HttpResponseError(message="server busy"))
+
+        def export() -> bool:
+            raise RuntimeError("export failed")
+
+        with self.assertRaisesRegex(RuntimeError, "export failed"):
+            self.export_from_copy(databases, export)
+        self.assertIn(self.copy.copy_name, self.stderr.getvalue())
+        self.assertIn("server busy", self.stderr.getvalue())
+
+    def test_reports_failed_drop(self) -> None:
+        databases = FakeDatabases(HttpResponseError(message="server busy"))
+        self.export_from_copy(databases, lambda: True)
+        self.assertIn(self.copy.copy_name, self.stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
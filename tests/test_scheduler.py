@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from bacpacman import scheduler
+
+
+def _fail() -> None:
+    raise scheduler.JobFailed("failed")
+
+
+def _succeed() -> None:
+    pass
+
+
+class RunJobsTest(unittest.TestCase):
+    def run_jobs(
+        self, jobs: list[scheduler.Job], limits: scheduler.Limits
+    ) -> list[scheduler.JobResult]:
+        """Runs jobs on a thread, failing the test if they do not finish."""
+        results: list[scheduler.JobResult] = []
+        thread = threading.Thread(
+            target=lambda: results.extend(scheduler.run_jobs(jobs, limits)),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), "run_jobs did not finish")
+        return results
+
+    def test_skips_chain_listed_before_its_failed_root(self) -> None:
+        jobs = [
+            scheduler.Job("A", _fail),
+            scheduler.Job("B", _succeed, depends_on=["C"]),
+            scheduler.Job("C", _succeed, depends_on=["A"]),
+        ]
+        for max_parallel in (1, 2):
+            with self.subTest(max_parallel=max_parallel):
+                results = self.run_jobs(
+                    jobs, scheduler.Limits(max_parallel=max_parallel)
+                )
+                self.assertEqual(
+                    [r.status for r in results], ["failed", "skipped", "skipped"]
+                )
+
+    def test_runs_dependencies_first(self) -> None:
+        order: list[str] = []
+        jobs = [
+            scheduler.Job("B", lambda: order.append("B"), depends_on=["A"]),
+            scheduler.Job("A", lambda: order.append("A")),
+        ]
+        results = self.run_jobs(jobs, scheduler.Limits(max_parallel=2))
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertEqual(order, ["A", "B"])
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.bacpac = os.path.join(directory.name, "db.bacpac")
+        self.state = scheduler.RunState(os.path.join(directory.name, "state.json"))
+        self.ran: list[str] = []
+
+    def clone_jobs(self) -> list[scheduler.Job]:
+        return [
+            scheduler.Job(
+                "export", lambda: self.ran.append("export"), output=self.bacpac
+            ),
+            scheduler.Job(
+                "import", lambda: self.ran.append("import"), depends_on=["export"]
+            ),
+        ]
+
+    def record(self, *names: str) -> None:
+        for job in self.clone_jobs():
+            if job.name in names:
+                self.state.mark_done(scheduler.JobResult(job, "succeeded"))
+
+    def test_reruns_export_whose_output_is_missing(self) -> None:
+        self.record("export")
+        scheduler.run_jobs(self.clone_jobs(), state=self.state)
+        self.assertEqual(self.ran, ["export", "import"])
+
+    def test_trusts_export_whose_output_exists(self) -> None:
+        self.record("export")
+        open(self.bacpac, "w").close()
+        scheduler.run_jobs(self.clone_jobs(), state=self.state)
+        self.assertEqual(self.ran, ["import"])
+
+    def test_skips_export_consumed_by_finished_import(self) -> None:
+        self.record("export", "import")
+        results = scheduler.run_jobs(self.clone_jobs(), state=self.state)
+        self.assertEqual(self.ran, [])
+        self.assertTrue(all(r.resumed for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()